@@ -1,13 +1,43 @@
-from flask import Flask
-from app.sequence_handler import SequenceHandler
-from app.guide_rna_analyzer import GuideRNAAnalyzer
-import os
+from config import get_config
 
-app = Flask(__name__)
-app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev_secret_key')
 
-# Initialize core services
-sequence_handler = SequenceHandler()
-guide_rna_analyzer = GuideRNAAnalyzer()
+def create_app(config_class=None):
+    """
+    Build the Flask app for a config class (default: from FLASK_ENV).
 
-from app import routes
\ No newline at end of file
+    Apps built in the same process share one set of analysis services
+    (see app.services), so building another app is cheap and caches are
+    never split between them.
+    """
+    from flask import Flask
+    from app.json_provider import CrispradiumJSONProvider
+    from app.services import get_services
+    from app.routes import bp as routes_bp
+    from app.commands import bp as commands_bp
+
+    config_class = config_class or get_config()
+    app = Flask(__name__)
+    config_class.init_app(app)
+    app.config.from_object(config_class)
+    app.json = CrispradiumJSONProvider(app)
+    # Guide lists are large; don't pretty-print them in debug mode either
+    app.json.compact = True
+    app.extensions['crispradium'] = get_services(config_class)
+
+    app.register_blueprint(routes_bp)
+    app.register_blueprint(commands_bp)
+    return app
+
+
+def preload(config_class=None):
+    """
+    Build this process's services and do their first-use work (ViennaRNA
+    and Biopython imports, PAM scanners, the /systems response) now. Call it
+    in a server's master process before it forks workers, so every worker
+    starts with them already in (copy-on-write) memory.
+    """
+    from app.services import get_services
+
+    services = get_services(config_class or get_config())
+    services.warm()
+    return services
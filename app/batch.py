@@ -0,0 +1,154 @@
+import atexit
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from threading import Lock
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from app.guide_rna_analyzer import GuideRNAAnalyzer
+
+logger = logging.getLogger(__name__)
+
+# Analyzer of the current worker process
+_analyzer = None
+
+
+def _init_worker(config) -> None:
+    global _analyzer
+    # The batch pool is the parallelism here, so no nested fold pool
+    _analyzer = GuideRNAAnalyzer(type('BatchWorkerConfig', (config,), {'FOLD_WORKERS': 0}))
+
+
+def _compare_systems(sequence: str, systems: List[str]) -> Dict[str, Any]:
+    """Runs in a worker: every system for one sequence in a single pass."""
+    try:
+        return _analyzer.compare_systems(sequence, systems)
+    except Exception:
+        logger.exception('Batch analysis of a %d bp sequence failed', len(sequence))
+        raise
+
+
+class BatchRunner:
+    """
+    Analyzes many records for one or more CRISPR systems in one request.
+
+    Records with identical sequences are analyzed once. Analysis is CPU
+    bound, so distinct sequences are spread over a persistent pool of
+    `workers` processes, each with its own analyzer and fold cache (set
+    FOLD_STORE_PATH to share folds between them). Batches with a single
+    distinct sequence, or a runner with no workers, are analyzed in the
+    calling thread with the shared analyzer instead. Each record succeeds
+    or fails on its own.
+    """
+
+    def __init__(self, analyzer, config, workers: int = 2):
+        self.analyzer = analyzer
+        self.config = config
+        self.workers = workers
+        self._executor = None
+        self._lock = Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn keeps workers independent of the parent's threads and
+                # open sockets (Flask dev server, gunicorn)
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    initializer=_init_worker,
+                    initargs=(self.config,),
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+                atexit.register(self.shutdown)
+            return self._executor
+
+    def run(self, entries: Sequence[Dict[str, Any]], systems: List[str],
+            progress: Optional[Callable[[int, int], None]] = None) -> List[Dict[str, Any]]:
+        """
+        Analyze validated record entries (as yielded by
+        SequenceHandler.iter_fasta_records) for every system. Returns, in
+        input order, {'id', 'sequence', 'sequence_info', 'results': {system:
+        results}, 'duplicate_of'} or {'id', 'error'} per record.
+        `progress`, if given, is called with (distinct sequences analyzed,
+        total) as they finish; an exception raised from it aborts the batch.
+        """
+        unknown = [system for system in systems if system not in self.analyzer.crispr_systems]
+        if unknown:
+            raise ValueError(f"Unsupported CRISPR system: {', '.join(unknown)}")
+
+        # sequence -> first record with it
+        first_records: Dict[str, Dict[str, Any]] = {}
+        for entry in entries:
+            if entry['valid']:
+                first_records.setdefault(entry['sequence']['sequence'], entry)
+
+        futures = {}
+        if self.workers > 0 and len(first_records) > 1:
+            executor = self._get_executor()
+            futures = {sequence: executor.submit(_compare_systems, sequence, systems)
+                       for sequence in first_records}
+
+        try:
+            return self._collect(entries, systems, first_records, futures, progress)
+        finally:
+            # Only left running if the batch was aborted
+            for future in futures.values():
+                future.cancel()
+
+    def _collect(self, entries, systems, first_records, futures, progress) -> List[Dict[str, Any]]:
+        """Outcomes in input order, waiting for (or running) each distinct analysis."""
+        # sequence -> its analysis, or the exception it failed with
+        analyses: Dict[str, Any] = {}
+        outcomes = []
+        for entry in entries:
+            if not entry['valid']:
+                outcomes.append({'id': entry['id'], 'error': entry['error']})
+                continue
+
+            sequence_info = dict(entry['sequence'])
+            sequence = sequence_info.pop('sequence')
+            if sequence not in analyses:
+                try:
+                    analyses[sequence] = self._wait(futures.get(sequence), sequence, systems)
+                except Exception as e:
+                    analyses[sequence] = e
+                if progress is not None:
+                    progress(len(analyses), len(first_records))
+            results = analyses[sequence]
+            if isinstance(results, Exception):
+                outcomes.append({'id': sequence_info['id'], 'error': str(results)})
+                continue
+            first = first_records[sequence]
+            outcomes.append({
+                'id': sequence_info['id'],
+                'sequence': sequence,
+                'sequence_info': sequence_info,
+                'results': results['results'],
+                'duplicate_of': first['sequence']['id'] if first is not entry else None
+            })
+        return outcomes
+
+    def _wait(self, future, sequence: str, systems: List[str]) -> Dict[str, Any]:
+        """Analysis of one distinct sequence, from the pool if it was sent there."""
+        if future is not None:
+            try:
+                return future.result()
+            except BrokenProcessPool:
+                # A worker died (OOM, signal); drop the pool and finish serially
+                self.shutdown()
+        return self._analyze(sequence, systems)
+
+    def _analyze(self, sequence: str, systems: List[str]) -> Dict[str, Any]:
+        try:
+            return self.analyzer.compare_systems(sequence, systems)
+        except Exception:
+            logger.exception('Batch analysis of a %d bp sequence failed', len(sequence))
+            raise
+
+    def shutdown(self) -> None:
+        """Stop worker processes; the pool restarts on next use."""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
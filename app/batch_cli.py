@@ -0,0 +1,275 @@
+import json
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional
+
+import click
+import pandas as pd
+
+from app.guide_rna_analyzer import GuideRNAAnalyzer
+from app.guide_set import GuideSet
+from app.sequence_handler import SequenceHandler
+from config import get_config
+
+COLUMNS = ['record_id', 'system', 'position', 'strand', 'sequence', 'pam', 'gc_content',
+           'structure', 'energy', 'structure_score', 'efficiency_score']
+
+# Analyzer of the current worker process
+_analyzer = None
+
+
+def _batch_config():
+    # The process pool is the parallelism here, so no nested fold pool; and
+    # library records are unrelated, so no result cache or incremental
+    # history to maintain. The fold cache (and FOLD_STORE_PATH, if set)
+    # still carry folds from one record to the next.
+    return type('BatchConfig', (get_config(),), {
+        'FOLD_WORKERS': 0,
+        'RESULT_CACHE_MAX_BYTES': 0,
+        'INCREMENTAL_HISTORY': 0
+    })
+
+
+def _init_worker() -> None:
+    global _analyzer
+    _analyzer = GuideRNAAnalyzer(_batch_config())
+
+
+def guides_frame(record_id: str, system: str, guides: GuideSet) -> pd.DataFrame:
+    """One row per guide, straight from the GuideSet columns."""
+    return pd.DataFrame({
+        'record_id': record_id,
+        'system': system,
+        'position': guides.positions,
+        'strand': guides.strands,
+        'sequence': guides.sequences,
+        'pam': guides.pams,
+        'gc_content': guides.gc_contents,
+        'structure': guides.structures,
+        'energy': guides.energies,
+        'structure_score': guides.structure_scores,
+        'efficiency_score': guides.efficiency_scores
+    }, columns=COLUMNS)
+
+
+def _analyze_record(record_id: str, sequence: str, systems: List[str]) -> pd.DataFrame:
+    """Runs in a worker: all systems for one record in a single pass."""
+    comparison = _analyzer.compare_systems(sequence, systems)
+    return pd.concat([guides_frame(record_id, system, results['guides'])
+                      for system, results in comparison['results'].items()], ignore_index=True)
+
+
+class TsvOutput:
+    """Guides appended to one TSV file; the checkpoint records its length."""
+
+    def __init__(self, path: str, state: Optional[Dict[str, Any]] = None):
+        self.path = path
+        self.handle = open(path, 'r+b' if state else 'wb')
+        if state:
+            # Drop anything written after the last checkpoint
+            self.handle.truncate(state['bytes'])
+            self.handle.seek(state['bytes'])
+        self.pending = []
+
+    def write(self, frame: pd.DataFrame) -> None:
+        self.pending.append(frame)
+
+    def commit(self) -> Dict[str, Any]:
+        """Write buffered rows durably and return the state to checkpoint."""
+        if self.pending:
+            frame = pd.concat(self.pending, ignore_index=True)
+            header = self.handle.tell() == 0
+            self.handle.write(frame.to_csv(sep='\t', index=False, header=header, na_rep='').encode())
+            self.pending = []
+        self.handle.flush()
+        os.fsync(self.handle.fileno())
+        return {'bytes': self.handle.tell()}
+
+    def close(self) -> None:
+        self.handle.close()
+
+
+class ParquetOutput:
+    """
+    Guides written as a directory of Parquet part files, one per checkpoint
+    (a finished Parquet file can't be appended to).
+    """
+
+    def __init__(self, path: str, state: Optional[Dict[str, Any]] = None):
+        # Fails early if neither pyarrow nor fastparquet is installed
+        pd.io.parquet.get_engine('auto')
+        self.path = path
+        self.parts = state['parts'] if state else 0
+        os.makedirs(path, exist_ok=True)
+        for name in os.listdir(path):
+            # Parts past the last checkpoint (or from an earlier run)
+            if name.startswith('part-') and name.endswith('.parquet') and int(name[5:-8]) >= self.parts:
+                os.remove(os.path.join(path, name))
+        self.pending = []
+
+    def write(self, frame: pd.DataFrame) -> None:
+        self.pending.append(frame)
+
+    def commit(self) -> Dict[str, Any]:
+        if self.pending:
+            frame = pd.concat(self.pending, ignore_index=True)
+            frame.to_parquet(os.path.join(self.path, f'part-{self.parts:05d}.parquet'), index=False)
+            self.parts += 1
+            self.pending = []
+        return {'parts': self.parts}
+
+    def close(self) -> None:
+        pass
+
+
+OUTPUTS = {'tsv': TsvOutput, 'parquet': ParquetOutput}
+
+
+def _load_checkpoint(path: str, expected: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """The saved progress of a matching earlier run, if any."""
+    try:
+        with open(path) as handle:
+            checkpoint = json.load(handle)
+    except FileNotFoundError:
+        return None
+    mismatched = [name for name, value in expected.items() if checkpoint.get(name) != value]
+    if mismatched:
+        raise click.UsageError(f"Checkpoint {path} is for a different run ({', '.join(mismatched)} differ); "
+                               f"delete it or drop --resume")
+    return checkpoint
+
+
+def _save_checkpoint(path: str, checkpoint: Dict[str, Any]) -> None:
+    # Written aside and renamed, so a crash never leaves half a checkpoint
+    temporary = f'{path}.tmp'
+    with open(temporary, 'w') as handle:
+        json.dump(checkpoint, handle, indent=2)
+        handle.flush()
+        os.fsync(handle.fileno())
+    os.replace(temporary, path)
+
+
+@click.command()
+@click.argument('fasta_path', type=click.Path(exists=True, dir_okay=False))
+@click.argument('output_path', type=click.Path())
+@click.option('--system', 'systems', multiple=True, default=['SpCas9'], show_default=True,
+              help='CRISPR system to analyze for; repeat for several.')
+@click.option('--format', 'output_format', type=click.Choice(sorted(OUTPUTS)),
+              help='Output format (default: parquet if OUTPUT_PATH ends in .parquet, else tsv).')
+@click.option('--workers', type=click.IntRange(min=1), default=os.cpu_count() or 1, show_default=True,
+              help='Analysis processes.')
+@click.option('--checkpoint-every', type=click.IntRange(min=1), default=100, show_default=True,
+              help='Records between checkpoints (and Parquet part files).')
+@click.option('--resume', is_flag=True,
+              help='Continue from the checkpoint of an interrupted run instead of starting over.')
+def main(fasta_path, output_path, systems, output_format, workers, checkpoint_every, resume):
+    """
+    Analyze every record of FASTA_PATH and write its guides to OUTPUT_PATH.
+
+    Records are streamed from disk and analyzed in order across a pool of
+    worker processes. Progress is checkpointed to OUTPUT_PATH.checkpoint,
+    so an interrupted run picks up where it stopped with --resume.
+
+        crispradium-batch library.fa guides.tsv --system SpCas9 --system SaCas9
+    """
+    systems = list(dict.fromkeys(systems))
+    analyzer = GuideRNAAnalyzer(_batch_config())
+    unknown = [system for system in systems if system not in analyzer.crispr_systems]
+    if unknown:
+        raise click.UsageError(f"Unsupported CRISPR system: {', '.join(unknown)}")
+    output_format = output_format or ('parquet' if output_path.endswith('.parquet') else 'tsv')
+
+    checkpoint_path = f'{output_path}.checkpoint'
+    # Resuming under another FOLD_MODE would mix energies from both modes
+    run = {'input': os.path.abspath(fasta_path), 'systems': systems, 'format': output_format,
+           'fold_mode': analyzer.fold_params.mode}
+    checkpoint = _load_checkpoint(checkpoint_path, run) if resume else None
+    if checkpoint is None:
+        checkpoint = {**run, 'records': 0, 'guides': 0, 'errors': 0, 'output': None, 'complete': False}
+    skip = checkpoint['records']
+
+    try:
+        output = OUTPUTS[output_format](output_path, checkpoint['output'])
+    except ImportError as e:
+        raise click.UsageError(f'{output_format} output needs an extra package: {e}')
+
+    # This run only, for the throughput summary
+    analyzed = bases = guides = 0
+    started = time.perf_counter()
+
+    def commit() -> None:
+        checkpoint['output'] = output.commit()
+        _save_checkpoint(checkpoint_path, checkpoint)
+        elapsed = time.perf_counter() - started
+        click.echo(f"{checkpoint['records']:,} records, {checkpoint['guides']:,} guides "
+                   f"({analyzed / elapsed:.1f} records/s)", err=True)
+
+    def finish(record_id: str, future, error: Optional[str]) -> None:
+        nonlocal analyzed, guides
+        if future is not None:
+            try:
+                frame = future.result()
+            except BrokenProcessPool:
+                # A worker died (OOM, signal): stop, keeping the checkpoint
+                raise
+            except Exception as e:
+                error = str(e)
+            else:
+                output.write(frame)
+                guides += len(frame)
+                checkpoint['guides'] += len(frame)
+        if error is not None:
+            checkpoint['errors'] += 1
+            click.echo(f'{record_id}: {error}', err=True)
+        analyzed += 1
+        checkpoint['records'] += 1
+        if checkpoint['records'] % checkpoint_every == 0:
+            commit()
+
+    handler = SequenceHandler()
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                               mp_context=multiprocessing.get_context('spawn'))
+    # (record id, future or None, validation error or None), consumed in
+    # input order so the checkpoint is just a count of finished records
+    in_flight = deque()
+    try:
+        if not checkpoint['complete']:
+            with open(fasta_path) as fasta_handle:
+                for index, entry in enumerate(handler.iter_fasta_records(fasta_handle)):
+                    if index < skip:
+                        continue
+                    if entry['valid']:
+                        record = entry['sequence']
+                        bases += record['length']
+                        future = pool.submit(_analyze_record, record['id'], record['sequence'], systems)
+                        in_flight.append((record['id'], future, None))
+                    else:
+                        in_flight.append((entry['id'], None, entry['error']))
+                    # Keep every worker busy without reading the whole file ahead
+                    while len(in_flight) > workers * 4:
+                        finish(*in_flight.popleft())
+
+            while in_flight:
+                finish(*in_flight.popleft())
+            checkpoint['complete'] = True
+            commit()
+    except KeyboardInterrupt:
+        raise click.Abort()
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+        output.close()
+
+    elapsed = time.perf_counter() - started
+    click.echo(
+        f"Analyzed {analyzed:,} records ({bases / 1000:,.1f} kb) for {', '.join(systems)} "
+        f"in {elapsed:.1f}s with {workers} workers ({run['fold_mode']} folding)"
+        + (f", resuming after {skip:,} records" if skip else '')
+    )
+    if analyzed:
+        click.echo(f"Throughput: {analyzed / elapsed:,.1f} records/s, {bases / 1000 / elapsed:,.1f} kb/s, "
+                   f"{guides / elapsed:,.0f} guides/s")
+    click.echo(f"{checkpoint['guides']:,} guides in {output_path}; {checkpoint['errors']:,} records failed")
@@ -0,0 +1,19 @@
+import click
+from flask import Blueprint
+from app.genome_index import build_genome_index
+
+# CLI-only blueprint; its commands sit at the top level of `flask`
+bp = Blueprint('commands', __name__, cli_group=None)
+
+
+@bp.cli.command('build-genome-index')
+@click.argument('fasta_path', type=click.Path(exists=True, dir_okay=False))
+@click.argument('output_dir', type=click.Path(file_okay=False))
+@click.option('--seed-length', default=10, show_default=True,
+              help='Seed k-mer length; guides of length L can be searched with up to 2 * (L // k) - 1 mismatches.')
+def build_genome_index_command(fasta_path, output_dir, seed_length):
+    """Build a memory-mapped genome index for off-target search."""
+    meta = build_genome_index(fasta_path, output_dir, seed_length)
+    total = sum(contig['length'] for contig in meta['contigs'])
+    click.echo(f"Indexed {len(meta['contigs'])} contigs ({total:,} bases) into {output_dir}")
+    click.echo(f"Set GENOME_INDEX_PATH={output_dir} to use it for off-target scoring")
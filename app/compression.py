@@ -0,0 +1,33 @@
+import gzip
+from typing import Optional
+
+try:
+    import brotli
+except ImportError:  # optional; gzip is always available
+    brotli = None
+
+# Most preferred first
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def choose_encoding(accept_encodings) -> Optional[str]:
+    """
+    Best encoding the client accepts (a werkzeug Accept-Encoding header),
+    or None to send the body as-is.
+    """
+    best, best_quality = None, 0
+    for encoding in ENCODINGS:
+        quality = accept_encodings[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(data: bytes, encoding: str, gzip_level: int = 6, brotli_quality: int = 4) -> bytes:
+    """Compress a response body with one of ENCODINGS."""
+    if encoding == 'br':
+        return brotli.compress(data, quality=brotli_quality)
+    if encoding == 'gzip':
+        # mtime=0 keeps output byte-identical for identical bodies
+        return gzip.compress(data, compresslevel=gzip_level, mtime=0)
+    raise ValueError(f'Unsupported content encoding: {encoding}')
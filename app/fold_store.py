@@ -0,0 +1,160 @@
+import json
+import logging
+import sqlite3
+import time
+from contextlib import closing
+from threading import Lock
+from typing import Any, Dict, Hashable, Mapping, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Stay well under SQLite's bound-parameter limit
+_BATCH = 500
+
+
+class FoldStore:
+    """
+    Persistent RNA folding results shared by every worker on the host.
+
+    Sits behind the in-memory FoldCache: a fold computed by any worker, or
+    before a restart, is reused instead of being folded again. Rows are
+    keyed by guide sequence plus the folding parameters, looked up and
+    written in bulk once per analysis, and evicted least recently used
+    once the store holds more than `max_entries`.
+
+    The store is only an optimization: database errors are logged and
+    treated as misses rather than failing the analysis.
+    """
+
+    def __init__(self, path: str, max_entries: int = 1000000):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._writes_since_check = 0
+        self._lock = Lock()
+        with closing(self._connect()) as db, db:
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('''
+                CREATE TABLE IF NOT EXISTS folds (
+                    params TEXT NOT NULL,
+                    sequence TEXT NOT NULL,
+                    structure TEXT NOT NULL,
+                    energy REAL NOT NULL,
+                    used_at REAL NOT NULL,
+                    PRIMARY KEY (params, sequence)
+                )
+            ''')
+            db.execute('CREATE INDEX IF NOT EXISTS folds_used_at ON folds (used_at)')
+
+    def _connect(self) -> sqlite3.Connection:
+        # Short-lived connections keep this safe across threads and processes
+        db = sqlite3.connect(self.path, timeout=30)
+        # Durable enough for a cache under WAL, and much cheaper per commit
+        db.execute('PRAGMA synchronous=NORMAL')
+        return db
+
+    @staticmethod
+    def params_key(params: Hashable) -> str:
+        """Stable text form of the folding parameters."""
+        return json.dumps(params, sort_keys=True, default=str)
+
+    def get_many(self, sequences: Sequence[str], params: Hashable) -> Dict[str, Tuple[Optional[str], float]]:
+        """Stored (structure, energy) for whichever of `sequences` are present."""
+        if not sequences:
+            return {}
+        key = self.params_key(params)
+        found = {}
+        try:
+            with closing(self._connect()) as db, db:
+                for start in range(0, len(sequences), _BATCH):
+                    batch = sequences[start:start + _BATCH]
+                    marks = ','.join('?' * len(batch))
+                    rows = db.execute(
+                        f'SELECT sequence, structure, energy FROM folds '
+                        f'WHERE params = ? AND sequence IN ({marks})',
+                        (key, *batch)
+                    ).fetchall()
+                    for sequence, structure, energy in rows:
+                        # Energy-only (fast mode) folds are stored without a structure
+                        found[sequence] = (structure or None, energy)
+                    if rows:
+                        hit = [row[0] for row in rows]
+                        db.execute(
+                            f'UPDATE folds SET used_at = ? WHERE params = ? '
+                            f'AND sequence IN ({",".join("?" * len(hit))})',
+                            (time.time(), key, *hit)
+                        )
+        except sqlite3.Error:
+            logger.warning('Fold store lookup failed, folding instead', exc_info=True)
+            found = {}
+
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(sequences) - len(found)
+        return found
+
+    def put_many(self, results: Mapping[str, Tuple[Optional[str], float]], params: Hashable) -> None:
+        """Store folding results, evicting old rows once over the size cap."""
+        if not results or self.max_entries <= 0:
+            return
+        key = self.params_key(params)
+        now = time.time()
+        try:
+            with closing(self._connect()) as db, db:
+                db.executemany(
+                    'INSERT OR REPLACE INTO folds (params, sequence, structure, energy, used_at) '
+                    'VALUES (?, ?, ?, ?, ?)',
+                    ((key, sequence, structure or '', energy, now)
+                     for sequence, (structure, energy) in results.items())
+                )
+                with self._lock:
+                    self._writes_since_check += len(results)
+                    # Counting rows isn't free; only check once enough has
+                    # been written to possibly cross the cap
+                    check = self._writes_since_check >= max(1, self.max_entries // 20)
+                    if check:
+                        self._writes_since_check = 0
+                if check:
+                    self._evict(db)
+        except sqlite3.Error:
+            logger.warning('Fold store write failed', exc_info=True)
+
+    def _evict(self, db: sqlite3.Connection) -> None:
+        """Trim to 90% of the cap, least recently used first."""
+        count = db.execute('SELECT COUNT(*) FROM folds').fetchone()[0]
+        if count <= self.max_entries:
+            return
+        excess = count - int(self.max_entries * 0.9)
+        db.execute(
+            'DELETE FROM folds WHERE rowid IN (SELECT rowid FROM folds ORDER BY used_at LIMIT ?)',
+            (excess,)
+        )
+        with self._lock:
+            self.evictions += excess
+
+    def clear(self) -> None:
+        """Drop all stored results and reset counters."""
+        with closing(self._connect()) as db, db:
+            db.execute('DELETE FROM folds')
+        with self._lock:
+            self.hits = self.misses = self.evictions = 0
+            self._writes_since_check = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return row count and hit/miss counters (this process only)."""
+        try:
+            with closing(self._connect()) as db:
+                entries = db.execute('SELECT COUNT(*) FROM folds').fetchone()[0]
+        except sqlite3.Error:
+            entries = None
+        lookups = self.hits + self.misses
+        return {
+            'entries': entries,
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0
+        }
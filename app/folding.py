@@ -0,0 +1,143 @@
+import atexit
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from itertools import repeat
+from threading import Lock
+from typing import Callable, List, NamedTuple, Optional, Sequence, Tuple
+
+# ViennaRNA, imported on first use: serving cached results, parsing input or
+# booting a worker shouldn't pay for it
+RNA = None
+
+
+def load_rna():
+    """Import ViennaRNA if it hasn't been yet and return the module."""
+    global RNA
+    if RNA is None:
+        import RNA as module
+        RNA = module
+    return RNA
+
+
+@lru_cache(maxsize=None)
+def fold_engine() -> str:
+    """
+    Folding results depend on the energy parameters shipped with ViennaRNA,
+    so anything persisting them is keyed by the library version too.
+    """
+    return f'ViennaRNA {getattr(load_rna(), "__version__", "unknown")}'
+
+
+# 'full' folds for the MFE structure and energy; 'fast' computes the MFE
+# energy only, skipping the structure backtrace
+FOLD_MODES = ('full', 'fast')
+
+
+class FoldParams(NamedTuple):
+    """Folding settings; hashable, so they also key cached and stored folds."""
+    mode: str
+    temperature: float
+    max_bp_span: int
+
+
+@lru_cache(maxsize=None)
+def model_details(params: FoldParams):
+    """ViennaRNA model details for a set of folding settings, built once per process."""
+    md = (RNA or load_rna()).md()
+    md.temperature = params.temperature
+    md.max_bp_span = params.max_bp_span
+    if params.mode == 'fast':
+        md.backtrack = 0
+    return md
+
+
+def fold_sequence(sequence: str, params: Optional[FoldParams] = None) -> Tuple[Optional[str], float]:
+    """
+    Fold a single sequence and return (structure, energy), with ViennaRNA
+    defaults unless `params` is given. The structure is None in fast mode.
+    """
+    rna = RNA or load_rna()
+    if params is None:
+        structure, energy = rna.fold(sequence)
+        return structure, energy
+    structure, energy = rna.fold_compound(sequence, model_details(params), rna.OPTION_MFE).mfe()
+    return (structure if params.mode == 'full' else None), energy
+
+
+def fold_chunk(sequences: Sequence[str], params: Optional[FoldParams] = None) -> List[Tuple[Optional[str], float]]:
+    """Fold a chunk of sequences; runs inside pool workers."""
+    return [fold_sequence(sequence, params) for sequence in sequences]
+
+
+class FoldPool:
+    """
+    Persistent process pool for RNA folding.
+
+    Folding is pure CPU work, so large batches are split into chunks and
+    folded across processes. Batches below `min_batch` (or a pool with no
+    workers) stay on the serial path, since pickling guides back and forth
+    costs more than it saves for small inputs. Results always come back in
+    input order.
+    """
+
+    def __init__(self, workers: int = 0, chunk_size: int = 256, min_batch: int = 2000):
+        self.workers = workers
+        self.chunk_size = max(1, chunk_size)
+        self.min_batch = min_batch
+        self._executor = None
+        self._lock = Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.workers > 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn keeps workers independent of the parent's threads and
+                # open sockets (Flask dev server, gunicorn)
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+                atexit.register(self.shutdown)
+            return self._executor
+
+    def fold(self, sequences: Sequence[str], params: Optional[FoldParams] = None,
+             progress: Optional[Callable[[int], None]] = None) -> List[Tuple[Optional[str], float]]:
+        """
+        Fold sequences, in parallel when the batch is large enough.
+        `progress`, if given, is called with the number folded so far after
+        each chunk; an exception raised from it aborts the batch.
+        """
+        if not self.enabled or len(sequences) < self.min_batch:
+            if progress is None:
+                return fold_chunk(sequences, params)
+            results = []
+            for i in range(0, len(sequences), self.chunk_size):
+                results.extend(fold_chunk(sequences[i:i + self.chunk_size], params))
+                progress(len(results))
+            return results
+
+        chunks = [sequences[i:i + self.chunk_size]
+                  for i in range(0, len(sequences), self.chunk_size)]
+        try:
+            results = []
+            for chunk_result in self._get_executor().map(fold_chunk, chunks, repeat(params)):
+                results.extend(chunk_result)
+                if progress is not None:
+                    progress(len(results))
+            return results
+        except BrokenProcessPool:
+            # A worker died (OOM, signal); drop the pool and finish serially
+            self.shutdown()
+            return fold_chunk(sequences, params)
+
+    def shutdown(self) -> None:
+        """Stop worker processes; the pool restarts on next use."""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
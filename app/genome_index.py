@@ -0,0 +1,331 @@
+import json
+import os
+from typing import Any, Dict, Iterator, List, NamedTuple, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from app.packed_sequence import PackedSequence
+from app.pam_scanner import reverse_complement
+
+INDEX_VERSION = 2
+META_FILE = 'meta.json'
+SEQUENCE_FILE = 'sequence.2bit'
+MASK_FILE = 'mask.2bit'
+OFFSETS_FILE = 'seed_offsets.npy'
+POSITIONS_FILE = 'seed_positions.npy'
+
+# Bases read, packed and seeded at a time while building (a multiple of 4).
+# Build memory is ~100 bytes per chunk base, whatever the contig lengths
+BUILD_CHUNK = 1 << 20
+# Max candidate windows verified at once, keeps query memory bounded
+VERIFY_CHUNK = 1 << 20
+
+
+class GenomeSite(NamedTuple):
+    """An off-target site in the reference genome."""
+    contig: str
+    position: int    # window start within the contig, forward strand (0-based)
+    strand: str
+    sequence: str    # site as read 5'->3' on its own strand
+    mismatches: int
+
+
+def _seed_ids(codes: np.ndarray, masked: np.ndarray, seed_length: int):
+    """Base-4 seed id of every k-mer (N read as A) plus its N count."""
+    if len(codes) < seed_length:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    weights = 4 ** np.arange(seed_length - 1, -1, -1, dtype=np.int64)
+    ids = sliding_window_view(codes.astype(np.int64), seed_length) @ weights
+    n_counts = sliding_window_view(masked, seed_length).sum(axis=1)
+    return ids, n_counts
+
+
+def _read_fasta(path: str, chunk_size: int) -> Iterator[Tuple[str, str, bool]]:
+    """
+    Stream a FASTA file as (record id, uppercase sequence chunk, first chunk
+    of the record) without holding any record whole. Every record yields at
+    least one (possibly empty) chunk; ids are the header up to the first
+    whitespace, as in Biopython.
+    """
+    name, lines, size, first = None, [], 0, True
+    with open(path) as handle:
+        for line in handle:
+            if line.startswith('>'):
+                if name is not None:
+                    yield name, ''.join(lines).upper(), first
+                name = (line[1:].split(None, 1) or [''])[0]
+                lines, size, first = [], 0, True
+                continue
+            if name is None:
+                continue
+            line = line.strip()
+            lines.append(line)
+            size += len(line)
+            if size >= chunk_size:
+                yield name, ''.join(lines).upper(), first
+                lines, size, first = [], 0, False
+    if name is not None:
+        yield name, ''.join(lines).upper(), first
+
+
+def _contig_seeds(packed: np.ndarray, mask: np.ndarray, contig: Dict[str, Any],
+                  seed_length: int) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """
+    (seed ids, global positions) of one packed contig, BUILD_CHUNK windows
+    at a time, sorted by id and then position within each chunk.
+
+    K-mers with one N are listed under all four bases at the N, so the
+    one-mismatch seed search still finds sites whose only seed mismatch is
+    an N in the genome; k-mers with more Ns are left out.
+    """
+    start, length = contig['offset'], contig['length']
+    weights = 4 ** np.arange(seed_length - 1, -1, -1, dtype=np.int64)
+    for chunk_start in range(0, max(length - seed_length + 1, 0), BUILD_CHUNK):
+        chunk_end = min(length, chunk_start + BUILD_CHUNK + seed_length - 1)
+        window = slice((start + chunk_start) // 4, (start + chunk_end + 3) // 4)
+        chunk = PackedSequence(packed[window], mask[window], chunk_end - chunk_start)
+        ids, n_counts = _seed_ids(chunk.codes, chunk.masked, seed_length)
+        positions = np.arange(len(ids), dtype=np.int64) + start + chunk_start
+
+        single = np.flatnonzero(n_counts == 1)
+        if len(single):
+            # N is read as A (code 0): add each base's weight at its offset
+            n_offsets = sliding_window_view(chunk.masked, seed_length)[single].argmax(axis=1)
+            expanded = ids[single, None] + np.arange(4) * weights[n_offsets][:, None]
+            ids = np.concatenate([ids[n_counts == 0], expanded.ravel()])
+            positions = np.concatenate([positions[n_counts == 0], np.repeat(positions[single], 4)])
+        else:
+            ids, positions = ids[n_counts == 0], positions[n_counts == 0]
+
+        order = np.lexsort((positions, ids))
+        yield ids[order], positions[order]
+
+
+def build_genome_index(fasta_path: str, output_dir: str, seed_length: int = 10) -> Dict[str, Any]:
+    """
+    Convert a reference FASTA into an on-disk genome index.
+
+    Writes the genome at 2 bits per base (plus an N mask in the same layout)
+    and a seed table of k-mer positions stored as CSR offsets/positions.
+    Contigs start on 4-base boundaries with at least one N in between, so
+    the FASTA is packed as it is read. Seeds are then counted and placed in
+    BUILD_CHUNK-base chunks read back from the packed file, so memory stays
+    bounded by the chunk size and the 4 ** seed_length offsets table (8 MB
+    for 10-mers), not the contig lengths.
+    """
+    if not 1 <= seed_length <= 12:
+        raise ValueError('seed_length must be between 1 and 12')
+    os.makedirs(output_dir, exist_ok=True)
+
+    contigs = []
+    offset = 0
+
+    # Pass 1: pack the sequence as it streams in. Chunks are written 4 bases
+    # at a time; a record's last partial byte is padded with N
+    with open(os.path.join(output_dir, SEQUENCE_FILE), 'wb') as sequence_file, \
+            open(os.path.join(output_dir, MASK_FILE), 'wb') as mask_file:
+
+        def write(bases: str) -> None:
+            packed = PackedSequence.from_string(bases)
+            sequence_file.write(packed.packed.tobytes())
+            mask_file.write(packed.mask.tobytes())
+
+        def finish(contig: Dict[str, Any], carry: str) -> int:
+            padded_length = (contig['length'] // 4 + 1) * 4
+            write(carry + 'N' * (padded_length - contig['length']))
+            return padded_length
+
+        carry = ''
+        for name, bases, first in _read_fasta(fasta_path, BUILD_CHUNK):
+            if first:
+                if contigs:
+                    offset += finish(contigs[-1], carry)
+                contigs.append({'name': name, 'offset': offset, 'length': 0})
+                carry = ''
+            contigs[-1]['length'] += len(bases)
+            bases = carry + bases
+            whole = len(bases) // 4 * 4
+            write(bases[:whole])
+            carry = bases[whole:]
+        if contigs:
+            offset += finish(contigs[-1], carry)
+
+    if not contigs:
+        raise ValueError(f'No FASTA records found in {fasta_path}')
+
+    packed = np.memmap(os.path.join(output_dir, SEQUENCE_FILE), dtype=np.uint8, mode='r')
+    mask = np.memmap(os.path.join(output_dir, MASK_FILE), dtype=np.uint8, mode='r')
+
+    # Pass 2: count seeds
+    counts = np.zeros(4 ** seed_length, dtype=np.int64)
+    for contig in contigs:
+        for ids, _ in _contig_seeds(packed, mask, contig, seed_length):
+            counts += np.bincount(ids, minlength=len(counts))
+    offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    np.save(os.path.join(output_dir, OFFSETS_FILE), offsets)
+    del counts
+
+    # Pass 3: fill positions chunk by chunk, in genome order, so every
+    # bucket ends up sorted
+    position_dtype = np.uint32 if offset < 2 ** 32 else np.uint64
+    positions = np.lib.format.open_memmap(
+        os.path.join(output_dir, POSITIONS_FILE), mode='w+',
+        dtype=position_dtype, shape=(int(offsets[-1]),)
+    )
+    cursor = offsets[:-1].copy()
+    for contig in contigs:
+        for ids, chunk_positions in _contig_seeds(packed, mask, contig, seed_length):
+            # rank of each entry inside its bucket for this chunk
+            bucket_starts = np.searchsorted(ids, ids, side='left')
+            positions[cursor[ids] + (np.arange(len(ids)) - bucket_starts)] = chunk_positions
+            cursor += np.bincount(ids, minlength=len(cursor))
+    positions.flush()
+    del positions, packed, mask
+
+    meta = {
+        'version': INDEX_VERSION,
+        'seed_length': seed_length,
+        'length': offset,
+        'contigs': contigs
+    }
+    with open(os.path.join(output_dir, META_FILE), 'w') as meta_file:
+        json.dump(meta, meta_file, indent=2)
+    return meta
+
+
+class GenomeIndex:
+    """
+    Read-only, memory-mapped genome index built by build_genome_index.
+
+    Every array is opened with mmap, so all worker processes on a host share
+    the same page cache instead of each loading the genome.
+
+    Search uses pigeonhole seeding like SeedIndex, but since genome-sized
+    buckets of short seeds hold millions of positions, the default seeds
+    are 10-mers: a guide is split into as few segments as needed for one
+    of them to be within one mismatch, and each segment seed is looked up
+    together with its one-substitution neighbours. That supports up to
+    2 * (len(guide) // seed_length) - 1 mismatches. N bases, in the guide or
+    the genome, count as mismatches against everything.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, META_FILE)) as meta_file:
+            self.meta = json.load(meta_file)
+        if self.meta.get('version') != INDEX_VERSION:
+            raise ValueError(f'Unsupported genome index version in {path}')
+
+        self.seed_length = self.meta['seed_length']
+        self.contigs = self.meta['contigs']
+        self.contig_offsets = np.array([c['offset'] for c in self.contigs], dtype=np.int64)
+        self.contig_ends = self.contig_offsets + np.array([c['length'] for c in self.contigs], dtype=np.int64)
+
+        self.packed = np.memmap(os.path.join(path, SEQUENCE_FILE), dtype=np.uint8, mode='r')
+        self.mask = np.memmap(os.path.join(path, MASK_FILE), dtype=np.uint8, mode='r')
+        self.offsets = np.load(os.path.join(path, OFFSETS_FILE), mmap_mode='r')
+        self.positions = np.load(os.path.join(path, POSITIONS_FILE), mmap_mode='r')
+
+    def max_mismatches_for(self, guide_length: int) -> int:
+        """Largest mismatch count the seed length can guarantee to find."""
+        return 2 * (guide_length // self.seed_length) - 1
+
+    def search(self, guide: str, max_mismatches: int = 3) -> List[GenomeSite]:
+        """Find genome sites within max_mismatches of guide, on both strands."""
+        guide = guide.upper()
+        if max_mismatches > self.max_mismatches_for(len(guide)):
+            raise ValueError(
+                f'Index seed length {self.seed_length} supports at most '
+                f'{self.max_mismatches_for(len(guide))} mismatches for a {len(guide)}-nt guide'
+            )
+
+        sites = []
+        for strand, query in (('+', guide), ('-', reverse_complement(guide))):
+            for start, mismatches in self._matches(query, max_mismatches):
+                contig = int(np.searchsorted(self.contig_offsets, start, side='right')) - 1
+                window = self._decode(start, len(query))
+                sites.append(GenomeSite(
+                    self.contigs[contig]['name'],
+                    start - int(self.contig_offsets[contig]),
+                    strand,
+                    window if strand == '+' else reverse_complement(window),
+                    mismatches
+                ))
+        return sites
+
+    def _seeds(self, query: PackedSequence, max_mismatches: int) -> List[Tuple[int, np.ndarray]]:
+        """
+        (query offset, seed ids) to look up for each of the query's segments.
+
+        With enough segments every segment seed is looked up exactly;
+        otherwise the query is split into fewer segments, one of which must
+        be within one mismatch, and each segment seed is expanded to all
+        its one-substitution neighbours (1 + 3k ids; 4 if it holds an N).
+        Segments whose seed is already known to mismatch more can't hold
+        the match and are skipped.
+        """
+        seed_length = self.seed_length
+        query_ids, n_counts = _seed_ids(query.codes, query.masked, seed_length)
+        weights = 4 ** np.arange(seed_length - 1, -1, -1, dtype=np.int64)
+        neighbours = max_mismatches >= len(query) // seed_length
+        segments = (max_mismatches + 2) // 2 if neighbours else max_mismatches + 1
+
+        seeds = []
+        for segment in range(segments):
+            offset = segment * len(query) // segments
+            seed_id = query_ids[offset]
+            if n_counts[offset] == 0 and not neighbours:
+                seeds.append((offset, np.array([seed_id])))
+            elif n_counts[offset] == 0:
+                codes = query.codes[offset:offset + seed_length].astype(np.int64)
+                changes = (np.arange(4) - codes[:, None]) * weights[:, None]
+                seeds.append((offset, np.append(seed_id, seed_id + changes[changes != 0])))
+            elif n_counts[offset] == 1 and neighbours:
+                # The N (read as A) is the one mismatch: try every base there
+                n_offset = int(query.masked[offset:offset + seed_length].argmax())
+                seeds.append((offset, seed_id + np.arange(4) * weights[n_offset]))
+        return seeds
+
+    def _matches(self, query: str, max_mismatches: int) -> List[tuple]:
+        """Sorted (global start, mismatches) for forward windows close to query."""
+        query_length = len(query)
+        query_packed = PackedSequence.from_string(query)
+
+        hits = []
+        for offset, seed_ids in self._seeds(query_packed, max_mismatches):
+            for seed_id in seed_ids.tolist():
+                bucket = self.positions[self.offsets[seed_id]:self.offsets[seed_id + 1]]
+                hits.append(bucket.astype(np.int64) - offset)
+        if not hits:
+            return []
+        starts = np.unique(np.concatenate(hits))
+
+        # Drop windows that run off the start or across a contig boundary
+        contig = np.searchsorted(self.contig_offsets, starts, side='right') - 1
+        inside = (contig >= 0) & (starts + query_length <= self.contig_ends[np.maximum(contig, 0)])
+        starts = starts[inside]
+
+        matches = []
+        for chunk_start in range(0, len(starts), VERIFY_CHUNK):
+            chunk = starts[chunk_start:chunk_start + VERIFY_CHUNK]
+            codes, masked = self._gather(chunk, query_length)
+            diff = (codes != query_packed.codes) | masked | query_packed.masked
+            mismatches = np.count_nonzero(diff, axis=1)
+            close = mismatches <= max_mismatches
+            matches.extend(zip(chunk[close].tolist(), mismatches[close].tolist()))
+        return matches
+
+    def _gather(self, starts: np.ndarray, length: int):
+        """Unpacked codes and N flags for windows at the given starts."""
+        index = starts[:, None] + np.arange(length)
+        shifts = ((index & 3) * 2).astype(np.uint8)
+        codes = (self.packed[index >> 2] >> shifts) & 3
+        masked = ((self.mask[index >> 2] >> shifts) & 1).astype(bool)
+        return codes, masked
+
+    def _decode(self, start: int, length: int) -> str:
+        """Decode one window to a string."""
+        codes, masked = self._gather(np.array([start], dtype=np.int64), length)
+        return PackedSequence.from_codes(codes[0], masked[0]).to_string()
@@ -0,0 +1,133 @@
+import base64
+import heapq
+import json
+from typing import Any, Dict, List, Mapping
+
+import numpy as np
+
+from app.guide_set import GuideSet
+
+# query parameter -> type
+FILTERS = {
+    'min_gc': float,
+    'max_gc': float,
+    'min_efficiency': float,
+    'strand': str,
+    'start': int,
+    'end': int,
+    'top_k': int
+}
+
+
+class InvalidQuery(ValueError):
+    """A malformed query parameter or cursor (the client's fault, a 400)."""
+
+
+def parse_guide_query(args: Mapping[str, str], default_limit: int, max_limit: int) -> Dict[str, Any]:
+    """
+    Read filter/ranking/page-size parameters from a request's query string
+    (or a decoded cursor's query, which the client can edit just as well).
+    Raises InvalidQuery for malformed values.
+    """
+    query = {}
+    for name, cast in FILTERS.items():
+        value = args.get(name)
+        if value in (None, ''):
+            continue
+        try:
+            query[name] = cast(value)
+        except (ValueError, TypeError):
+            raise InvalidQuery(f"Invalid value for '{name}': {value}")
+
+    if query.get('strand') not in (None, '+', '-'):
+        raise InvalidQuery("strand must be '+' or '-'")
+    if query.get('top_k', 1) < 1:
+        raise InvalidQuery('top_k must be positive')
+
+    try:
+        limit = int(args.get('limit', default_limit))
+    except (ValueError, TypeError):
+        raise InvalidQuery(f"Invalid value for 'limit': {args.get('limit')}")
+    query['limit'] = min(max(limit, 1), max_limit)
+    return query
+
+
+def select_guides(guides: GuideSet, query: Dict[str, Any]) -> List[int]:
+    """
+    Indices of guides matching the query's filters, in position order, or
+    the top_k by efficiency score (best first) when top_k is set.
+    """
+    mask = np.ones(len(guides), dtype=bool)
+    if 'min_gc' in query:
+        mask &= guides.gc_contents >= query['min_gc']
+    if 'max_gc' in query:
+        mask &= guides.gc_contents <= query['max_gc']
+    if 'min_efficiency' in query:
+        mask &= guides.efficiency_scores >= query['min_efficiency']
+    if 'strand' in query:
+        mask &= guides.strands == query['strand']
+    if 'start' in query:
+        mask &= guides.positions >= query['start']
+    if 'end' in query:
+        mask &= guides.positions <= query['end']
+    indices = np.flatnonzero(mask).tolist()
+
+    if 'top_k' in query:
+        # Heap selection is O(n log k); ties keep position order and
+        # unfolded guides (NaN) rank last
+        scores = np.nan_to_num(guides.efficiency_scores, nan=-np.inf).tolist()
+        indices = heapq.nlargest(query['top_k'], indices, key=scores.__getitem__)
+    return indices
+
+
+def encode_cursor(result_key: str, query: Dict[str, Any], offset: int) -> str:
+    """Opaque cursor pointing at the next page of a cached result."""
+    payload = json.dumps({'key': result_key, 'query': query, 'offset': offset}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """
+    Inverse of encode_cursor; raises InvalidQuery for malformed cursors.
+    Only the shape is checked: pass the query through parse_guide_query.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        key, query, offset = payload['key'], payload['query'], payload['offset']
+    except (ValueError, KeyError, TypeError):
+        raise InvalidQuery('Invalid cursor')
+    # bool is an int subclass, but never a valid offset
+    if (not isinstance(key, str) or not isinstance(query, dict)
+            or type(offset) is not int or offset < 0):
+        raise InvalidQuery('Invalid cursor')
+    return {'key': key, 'query': query, 'offset': offset}
+
+
+def paginate(results: Mapping[str, Any], result_key: str, query: Dict[str, Any],
+             offset: int = 0) -> Dict[str, Any]:
+    """
+    Copy of an analysis result holding only one page of guides, plus page
+    metadata. Statistics and chart data describe the whole set; chart data
+    is only sent with the first page.
+    """
+    guides = results['guides']
+    if not isinstance(guides, GuideSet):
+        guides = GuideSet.from_records(guides)
+    selected = select_guides(guides, query)
+    page = selected[offset:offset + query['limit']]
+    next_offset = offset + len(page)
+
+    data = dict(results)
+    if offset:
+        data.pop('visualization_data', None)
+    data['guides'] = guides.to_records(page)
+    data['page'] = {
+        'offset': offset,
+        'limit': query['limit'],
+        'returned': len(page),
+        'total': len(selected),
+        'filters': {name: value for name, value in query.items() if name != 'limit'},
+        'next_cursor': encode_cursor(result_key, query, next_offset) if next_offset < len(selected) else None
+    }
+    return data
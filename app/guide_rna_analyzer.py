@@ -1,9 +1,53 @@
-import RNA
-from typing import Dict, Any
+from typing import Dict, Any, List, Tuple, Callable, Optional
+from collections import OrderedDict
+from functools import cached_property
+from threading import Lock
+import hashlib
+import json
+from app.pam_scanner import PamScanner
+from app.fold_cache import FoldCache
+from app.result_cache import ResultCache
+from app.folding import FOLD_MODES, FoldParams, FoldPool, fold_sequence, fold_engine
+from app.fold_store import FoldStore
+from app.packed_sequence import PackedSequence
+from app.guide_set import GuideSet
+from app.metrics import (stage, system_label, current_system, CACHE_HITS, CACHE_MISSES, FOLD_CALLS,
+                         FOLDS_AVOIDED, GUIDES_PER_ANALYSIS, GUIDES_REUSED)
+import numpy as np
+from config import get_config
 
 class GuideRNAAnalyzer:
-    def __init__(self):
-        self.cache = {}
+    def __init__(self, config=None):
+        self.config = config or get_config()
+        # Results expire after CACHE_TIMEOUT and are evicted by estimated size
+        self.cache = ResultCache(self.config.RESULT_CACHE_MAX_BYTES, self.config.CACHE_TIMEOUT)
+        # Folding results are shared by every request and every system
+        self.fold_cache = FoldCache(self.config.FOLD_CACHE_SIZE)
+        # ...and, optionally, by every worker on the host across restarts
+        self.fold_store = None
+        if self.config.FOLD_STORE_PATH:
+            self.fold_store = FoldStore(self.config.FOLD_STORE_PATH, self.config.FOLD_STORE_MAX_ENTRIES)
+        # ViennaRNA settings for every fold; worker processes build their
+        # model details from them once
+        fold_mode = self.config.FOLD_MODE
+        if fold_mode not in FOLD_MODES:
+            raise ValueError(f"Unsupported fold mode: {fold_mode}")
+        max_bp_span = self.config.RNA_FOLDING['max_bp_span']
+        if fold_mode == 'fast':
+            max_bp_span = min(max_bp_span, self.config.FAST_FOLD_MAX_BP_SPAN)
+        self.fold_params = FoldParams(fold_mode, self.config.RNA_FOLDING['temperature'], max_bp_span)
+        # Large batches of misses are folded across processes (off by default)
+        self.fold_pool = FoldPool(
+            workers=self.config.FOLD_WORKERS,
+            chunk_size=self.config.FOLD_CHUNK_SIZE,
+            min_batch=self.config.PARALLEL_FOLD_THRESHOLD
+        )
+        # Cheap GC prefilter deciding which candidates are worth folding
+        self.prefilter = {
+            'min_gc': self.config.PREFILTER_MIN_GC,
+            'max_gc': self.config.PREFILTER_MAX_GC,
+            'top_n': self.config.FOLD_TOP_N
+        }
         self.crispr_systems = {
             'SpCas9': {
                 'pam_sequence': 'NGG',
@@ -59,89 +103,482 @@ class GuideRNAAnalyzer:
                 'notes': 'Near-PAMless SpCas9, lower activity'
             }
         }
+        
+        # Recently analyzed inputs (cache key -> (system, sequence)), so a
+        # lightly edited resubmission can reuse the unchanged part of the
+        # previous result
+        self.recent_inputs = OrderedDict()
+        self.max_recent_inputs = self.config.INCREMENTAL_HISTORY
+        self._recent_lock = Lock()
+        
+        # Compile every PAM once up front instead of per candidate
+        self.pam_scanners = {
+            name: PamScanner(info['pam_sequence'], info['guide_length'])
+            for name, info in self.crispr_systems.items()
+        }
+
+    @cached_property
+    def fingerprint(self) -> str:
+        """
+        Digest of every setting besides the input that shapes a result, so
+        results identified by (input, system) change identity with them.
+        """
+        return hashlib.sha256(json.dumps(
+            [fold_engine(), self.fold_params, self.prefilter, self.crispr_systems],
+            sort_keys=True, default=str
+        ).encode()).hexdigest()[:16]
 
-    def analyze_sequence(self, sequence: str, system: str = 'SpCas9') -> Dict[str, Any]:
-        """Analyze sequence and find potential guide RNAs."""
+    def analyze_sequence(self, sequence: str, system: str = 'SpCas9',
+                         progress: Optional[Callable[[int, int], None]] = None) -> Dict[str, Any]:
+        """
+        Analyze sequence and find potential guide RNAs.
+        Results are shared through the cache and read-only; copy before editing.
+        `progress(folded, total)` is called as guides are folded.
+        """
         if system not in self.crispr_systems:
             raise ValueError(f"Unsupported CRISPR system: {system}")
             
-        cache_key = f"{sequence}_{system}"
-        if cache_key in self.cache:
-            return self.cache[cache_key]
+        cache_key = self.cache.make_key(sequence, system)
+        with system_label(system):
+            cached = self._lookup_result(cache_key)
+            if cached is not None:
+                self._remember_input(cache_key, system, sequence)
+                GUIDES_PER_ANALYSIS.observe(len(cached['guides']), system=system)
+                return cached
             
-        guides = self.find_guides(sequence, system)
+            # An edit of a recent input only needs the edited region rescanned
+            guides = self.find_guides_incremental(sequence, system, progress)
+            if guides is None:
+                guides = self.find_guides(sequence, system, progress)
+            
+            return self._store_results(sequence, system, guides)
+    
+    def _store_results(self, sequence: str, system: str, guides: GuideSet) -> Dict[str, Any]:
+        """Build the analysis result for a system's guides and cache it."""
+        with stage('statistics'):
+            statistics = self.calculate_statistics(guides)
+            visualization_data = self.prepare_visualization_data(guides)
         
+        folded = int(guides.folded.sum())
         results = {
             'guides': guides,
-            'statistics': self.calculate_statistics(guides),
-            'visualization_data': self.prepare_visualization_data(guides),
-            'system_info': self.crispr_systems[system]
+            'statistics': statistics,
+            'visualization_data': visualization_data,
+            'system_info': self.crispr_systems[system],
+            'metadata': {
+                'candidates': len(guides),
+                'folded': folded,
+                'folds_avoided': len(guides) - folded,
+                'fold_mode': self.fold_params.mode,
+                'prefilter': self.prefilter
+            }
         }
+        FOLDS_AVOIDED.inc(len(guides) - folded, system=system)
+        GUIDES_PER_ANALYSIS.observe(len(guides), system=system)
         
-        self.cache[cache_key] = results
+        cache_key = self.cache.make_key(sequence, system)
+        with stage('cache_store'):
+            results = self.cache.put(cache_key, results)
+        self._remember_input(cache_key, system, sequence)
         return results
     
-    def find_guides(self, sequence: str, system: str = 'SpCas9') -> list:
-        """Find all possible guide RNAs in sequence."""
-        guides = []
-        system_info = self.crispr_systems[system]
-        pam_seq = system_info['pam_sequence']
-        guide_length = system_info['guide_length']
-        efficiency_weight = system_info['efficiency_weight']
-        
-        # Convert IUPAC codes to regex patterns
-        pam_pattern = self._convert_pam_to_regex(pam_seq)
-        
-        for i in range(len(sequence) - guide_length - len(pam_seq)):
-            potential_pam = sequence[i + guide_length:i + guide_length + len(pam_seq)]
-            if self._matches_pam(potential_pam, pam_pattern):
-                guide = sequence[i:i + guide_length]
-                guide_data = {
-                    'sequence': guide,
-                    'position': i,
-                    'pam': potential_pam,
-                    'gc_content': self.calculate_gc_content(guide),
-                    'structure_score': self.calculate_structure_score(guide),
-                }
-                # Apply system-specific efficiency weight
-                guide_data['efficiency_score'] = self.calculate_efficiency(guide) * efficiency_weight
-                guides.append(guide_data)
-        
-        return guides
+    def compare_systems(self, sequence: str, systems: Optional[List[str]] = None,
+                        progress: Optional[Callable[[int, int], None]] = None) -> Dict[str, Any]:
+        """
+        Analyze sequence for several CRISPR systems (default: all) in one pass.
 
-    def _convert_pam_to_regex(self, pam: str) -> str:
-        """
-        Convert IUPAC nucleotide codes to regex patterns.
-        Support for more PAM sequences.
-        """
-        iupac_map = {
-            'N': '[ATGC]',
-            'R': '[AG]',
-            'Y': '[CT]',
-            'M': '[AC]',
-            'K': '[GT]',
-            'S': '[GC]',
-            'W': '[AT]',
-            'H': '[ACT]',
-            'B': '[CGT]',
-            'V': '[ACG]',
-            'D': '[AGT]'
+        Systems with a cached analysis are reused. For the rest, each
+        distinct PAM/guide length is scanned once, GC comes from one shared
+        2-bit encoding of the sequence, and every protospacer selected by any
+        system's prefilter is folded once. Per-system results are identical
+        to analyze_sequence and are cached the same way. `merged` lists the
+        sites (same position, strand and protospacer) reachable by more than
+        one system, widest reach first.
+        """
+        systems = list(dict.fromkeys(systems or self.crispr_systems))
+        unknown = [system for system in systems if system not in self.crispr_systems]
+        if unknown:
+            raise ValueError(f"Unsupported CRISPR system: {', '.join(unknown)}")
+        
+        results = {}
+        pending = []
+        for system in systems:
+            cached = self.get_cached_analysis(sequence, system)
+            if cached is not None:
+                results[system] = cached
+            else:
+                pending.append(system)
+        
+        scans = {}
+        candidates = {}
+        if pending:
+            packed = PackedSequence.from_string(sequence)
+            window_gc = {}
+            for system in pending:
+                scanner = self.pam_scanners[system]
+                with system_label(system):
+                    # xCas9 and Cas9-NG, for one, share a PAM and guide length
+                    scan_key = (scanner.pam, scanner.guide_length)
+                    if scan_key not in scans:
+                        with stage('pam_scan'):
+                            scans[scan_key] = scanner.scan(sequence)
+                    sites = scans[scan_key]
+                    
+                    with stage('gc_content'):
+                        if scanner.guide_length not in window_gc:
+                            window_gc[scanner.guide_length] = packed.window_gc_content(scanner.guide_length)
+                        positions = np.fromiter((site.position for site in sites), dtype=np.int64, count=len(sites))
+                        gc_contents = window_gc[scanner.guide_length][positions]
+                candidates[system] = (sites, positions, gc_contents)
+        
+        # One fold per unique protospacer selected by any system
+        to_fold = []
+        for sites, positions, gc_contents in candidates.values():
+            to_fold.extend(sites[i].guide for i in np.flatnonzero(self.select_for_folding(gc_contents)).tolist())
+        with system_label('multi'), stage('fold'):
+            folds = self.fold_many(to_fold, progress)
+        
+        for system, (sites, positions, gc_contents) in candidates.items():
+            with system_label(system):
+                guides = [site.guide for site in sites]
+                known = [folds.get(guide) for guide in guides]
+                scored = self._score_guides(
+                    guides, positions, [site.strand for site in sites], [site.pam for site in sites],
+                    gc_contents, system,
+                    structures=[fold[0] if fold else None for fold in known],
+                    energies=np.array([fold[1] if fold else np.nan for fold in known], dtype=np.float64)
+                ) if sites else GuideSet.empty()
+                results[system] = self._store_results(sequence, system, scored)
+        
+        with stage('merge', 'multi'):
+            merged = self.merge_sites({system: results[system] for system in systems})
+        
+        return {
+            'results': {system: results[system] for system in systems},
+            'merged': merged,
+            'metadata': {
+                'systems': systems,
+                'cached_systems': [system for system in systems if system not in candidates],
+                'pam_scans': len(scans),
+                'unique_protospacers_folded': len(folds)
+            }
         }
-        return ''.join(iupac_map.get(c, c) for c in pam)
     
-    def _matches_pam(self, sequence: str, pattern: str) -> bool:
-        """Check if sequence matches PAM pattern."""
-        import re
-        return bool(re.match(f"^{pattern}$", sequence))
+    def merge_sites(self, results: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Sites reachable by more than one system, keyed by position, strand
+        and protospacer, with each system's efficiency score.
+        """
+        sites = {}
+        for system, analysis in results.items():
+            guides = analysis['guides']
+            if not isinstance(guides, GuideSet):
+                guides = GuideSet.from_records(guides)
+            for sequence, position, strand, efficiency in zip(
+                    guides.sequences.tolist(), guides.positions.tolist(),
+                    guides.strands.tolist(), guides.efficiency_scores.tolist()):
+                scores = sites.setdefault((position, strand, sequence), {})
+                scores[system] = None if np.isnan(efficiency) else efficiency
+        
+        merged = [
+            {
+                'sequence': sequence,
+                'position': position,
+                'strand': strand,
+                'systems': list(scores),
+                'efficiency_scores': scores
+            }
+            for (position, strand, sequence), scores in sites.items()
+            if len(scores) > 1
+        ]
+        merged.sort(key=lambda site: (-len(site['systems']), site['position'], site['strand']))
+        return merged
+    
+    def get_cached_analysis(self, sequence: str, system: str = 'SpCas9') -> Optional[Dict[str, Any]]:
+        """Return the cached analysis for sequence, if there is one."""
+        with system_label(system):
+            return self._lookup_result(self.cache.make_key(sequence, system))
+    
+    def _lookup_result(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """Result cache lookup, counted under the current system."""
+        result = self.cache.get(cache_key)
+        _count_lookups('result', int(result is not None), int(result is None))
+        return result
+    
+    def find_guides(self, sequence: str, system: str = 'SpCas9',
+                    progress: Optional[Callable[[int, int], None]] = None) -> GuideSet:
+        """
+        Find all possible guide RNAs in sequence, on both strands.
+        Runs in two phases: cheap features (GC) for every candidate, then
+        RNA folding only for those that pass the prefilter. Unfolded guides
+        are kept with NaN energy and scores.
+        """
+        with stage('pam_scan'):
+            sites = self.pam_scanners[system].scan(sequence)
+        if not sites:
+            return GuideSet.empty()
+        
+        with stage('gc_content'):
+            positions = np.fromiter((site.position for site in sites), dtype=np.int64, count=len(sites))
+            # GC of every guide-length window in one vectorized pass; a
+            # reverse-strand guide has the same GC as its forward window
+            gc_contents = PackedSequence.from_string(sequence).window_gc_content(
+                self.crispr_systems[system]['guide_length']
+            )[positions]
+        
+        return self._score_guides(
+            [site.guide for site in sites], positions, [site.strand for site in sites],
+            [site.pam for site in sites], gc_contents, system, progress
+        )
+    
+    def find_guides_incremental(self, sequence: str, system: str = 'SpCas9',
+                                progress: Optional[Callable[[int, int], None]] = None) -> Optional[GuideSet]:
+        """
+        Find guides by patching the cached result of a recent, similar input.
+
+        The two inputs share a prefix and a suffix. Sites lying entirely in
+        either are identical in both, so their guide, GC and fold are reused
+        (suffix positions shifted by the length change). Only the region
+        between them is rescanned. Selection and scoring then run on the
+        combined set exactly as in find_guides, so the result is identical
+        to a full recompute. Returns None if no recent input shares at least
+        INCREMENTAL_MIN_SHARED of the sequence.
+        """
+        with stage('incremental_diff'):
+            base = self._find_similar_input(sequence, system)
+        if base is None:
+            return None
+        previous_sequence, previous, prefix, suffix = base
+        
+        scanner = self.pam_scanners[system]
+        guide_length, pam_length = scanner.guide_length, scanner.pam_length
+        length = len(sequence)
+        shift = length - len(previous_sequence)
+        
+        # Every site's protospacer + PAM lies within [position - PAM, position + guide + PAM)
+        old_positions = previous.positions
+        in_prefix = old_positions + guide_length + pam_length <= prefix
+        in_suffix = old_positions - pam_length >= len(previous_sequence) - suffix
+        reused = np.flatnonzero(in_prefix | in_suffix)
+        
+        with stage('pam_scan'):
+            # Widened so every site touching the edited region fits in it
+            start = max(0, prefix - guide_length - 2 * pam_length)
+            end = min(length, length - suffix + guide_length + 2 * pam_length)
+            window = sequence[start:end]
+            sites = [
+                site for site in scanner.scan(window)
+                if not (site.position + start + guide_length + pam_length <= prefix
+                        or site.position + start - pam_length >= length - suffix)
+            ]
+        
+        with stage('gc_content'):
+            positions = np.fromiter((site.position for site in sites), dtype=np.int64, count=len(sites))
+            gc_contents = PackedSequence.from_string(window).window_gc_content(guide_length)[positions]
+        
+        GUIDES_REUSED.inc(len(reused), system=system)
+        
+        # Merge reused and rescanned sites back into (position, strand) order
+        positions = np.concatenate((
+            np.where(in_prefix[reused], old_positions[reused], old_positions[reused] + shift),
+            positions + start
+        ))
+        strands = np.concatenate((previous.strands[reused], np.array([site.strand for site in sites], dtype='<U1')))
+        order = np.lexsort((strands, positions))
+        
+        def merged(old_column: np.ndarray, new_values: List[Any]) -> np.ndarray:
+            column = np.empty(len(order), dtype=old_column.dtype)
+            column[:len(reused)] = old_column[reused]
+            column[len(reused):] = new_values
+            return column[order]
+        
+        return self._score_guides(
+            merged(previous.sequences, [site.guide for site in sites]).tolist(),
+            positions[order],
+            strands[order],
+            merged(previous.pams, [site.pam for site in sites]).tolist(),
+            merged(previous.gc_contents, gc_contents),
+            system,
+            progress,
+            structures=merged(previous.structures, [None] * len(sites)).tolist(),
+            energies=merged(previous.energies, [np.nan] * len(sites))
+        )
+    
+    def _find_similar_input(self, sequence: str, system: str) -> Optional[Tuple[str, GuideSet, int, int]]:
+        """
+        The recent input (with its cached guides) sharing the longest prefix
+        plus suffix with sequence, or None if none shares enough.
+        """
+        with self._recent_lock:
+            candidates = [previous for recent_system, previous in reversed(self.recent_inputs.values())
+                          if recent_system == system]
+        
+        best = None
+        for previous in candidates:
+            prefix = _common_prefix_length(sequence, previous)
+            suffix = _common_suffix_length(sequence[prefix:], previous[prefix:])
+            if best is None or prefix + suffix > best[1] + best[2]:
+                best = (previous, prefix, suffix)
+        
+        if best is None or best[1] + best[2] < self.config.INCREMENTAL_MIN_SHARED * len(sequence):
+            return None
+        previous, prefix, suffix = best
+        results = self._lookup_result(self.cache.make_key(previous, system))
+        if results is None or not isinstance(results['guides'], GuideSet):
+            return None
+        return previous, results['guides'], prefix, suffix
+    
+    def _remember_input(self, cache_key: str, system: str, sequence: str) -> None:
+        """Track an analyzed input as a base for incremental re-analysis."""
+        if self.max_recent_inputs <= 0:
+            return
+        with self._recent_lock:
+            self.recent_inputs[cache_key] = (system, sequence)
+            self.recent_inputs.move_to_end(cache_key)
+            while len(self.recent_inputs) > self.max_recent_inputs:
+                self.recent_inputs.popitem(last=False)
+    
+    def _score_guides(self, guides: List[str], positions: np.ndarray, strands: List[str], pams: List[str],
+                      gc_contents: np.ndarray, system: str,
+                      progress: Optional[Callable[[int, int], None]] = None,
+                      structures: Optional[List[Optional[str]]] = None,
+                      energies: Optional[np.ndarray] = None) -> GuideSet:
+        """
+        Second phase of guide finding: fold the candidates the prefilter
+        selects and score every candidate. Known folds (structures/energies,
+        NaN where unknown) are reused; those of candidates the prefilter no
+        longer selects are dropped.
+        """
+        efficiency_weight = self.crispr_systems[system]['efficiency_weight']
+        
+        with stage('fold'):
+            selected = self.select_for_folding(gc_contents)
+            if energies is None:
+                structures = [None] * len(guides)
+                energies = np.full(len(guides), np.nan)
+            else:
+                structures = list(structures)
+                energies = np.where(selected, energies, np.nan)
+                for i in np.flatnonzero(~selected).tolist():
+                    structures[i] = None
+            
+            missing = np.flatnonzero(selected & np.isnan(energies)).tolist()
+            folds = self.fold_many([guides[i] for i in missing], progress)
+            for i in missing:
+                structures[i], energies[i] = folds[guides[i]]
+        
+        with stage('scoring'):
+            structure_scores = np.minimum(100, np.maximum(0, (np.abs(energies) / 30) * 100))
+            # Apply system-specific efficiency weight
+            efficiency_scores = self._efficiency_scores(gc_contents, structure_scores) * efficiency_weight
+            
+            return GuideSet(
+                guides, positions, strands, pams,
+                gc_contents, structures, energies, structure_scores, efficiency_scores
+            )
+    
+    def select_for_folding(self, gc_contents: np.ndarray) -> np.ndarray:
+        """
+        Mask of candidates worth folding: GC inside the prefilter range and,
+        if FOLD_TOP_N is set, among the N best by their efficiency upper
+        bound (the score they would get with a perfect structure score).
+        """
+        mask = (gc_contents >= self.prefilter['min_gc']) & (gc_contents <= self.prefilter['max_gc'])
+        top_n = self.prefilter['top_n']
+        if top_n and mask.sum() > top_n:
+            survivors = np.flatnonzero(mask)
+            gc_scores = 100 - np.minimum(np.abs(gc_contents[survivors] - 50), 50)
+            upper_bounds = gc_scores * 0.6 + 40
+            # Stable sort keeps position order among equal bounds
+            best = survivors[np.argsort(-upper_bounds, kind='stable')[:top_n]]
+            mask = np.zeros_like(mask)
+            mask[best] = True
+        return mask
+    
+    def score_guide(self, guide: str, system: str = 'SpCas9') -> Dict[str, Any]:
+        """
+        Fold and score a single guide on demand, e.g. one the prefilter
+        skipped during analysis.
+        """
+        if system not in self.crispr_systems:
+            raise ValueError(f"Unsupported CRISPR system: {system}")
+        structure_score = self.calculate_structure_score(guide)
+        efficiency = self.calculate_efficiency(guide, structure_score)
+        return {
+            'sequence': guide,
+            'gc_content': self.calculate_gc_content(guide),
+            'structure_score': structure_score,
+            'efficiency_score': efficiency * self.crispr_systems[system]['efficiency_weight'],
+            'fold_mode': self.fold_params.mode
+        }
     
     def calculate_gc_content(self, sequence: str) -> float:
         """Calculate GC content percentage."""
-        gc_count = sum(1 for base in sequence if base in 'GC')
+        gc_count = sequence.count('G') + sequence.count('C')
         return (gc_count / len(sequence)) * 100
     
+    def fold(self, sequence: str) -> Tuple[Optional[str], float]:
+        """Fold sequence with ViennaRNA, reusing cached results. The structure is None in fast mode."""
+        result = self.fold_cache.get(sequence, self.fold_params)
+        _count_lookups('fold', int(result is not None), int(result is None))
+        if result is None:
+            result = fold_sequence(sequence, self.fold_params)
+            self.fold_cache.put(sequence, self.fold_params, result)
+        return result
+    
+    def fold_many(self, sequences: List[str],
+                  progress: Optional[Callable[[int, int], None]] = None) -> Dict[str, Tuple[Optional[str], float]]:
+        """
+        Fold a batch of sequences, each unique sequence at most once.
+        Lookups go to the in-memory cache, then the shared fold store (if
+        configured); the remaining misses go to the fold pool, which
+        parallelizes large batches.
+        """
+        folds = {}
+        missing = []
+        for sequence in dict.fromkeys(sequences):
+            result = self.fold_cache.get(sequence, self.fold_params)
+            if result is None:
+                missing.append(sequence)
+            else:
+                folds[sequence] = result
+        _count_lookups('fold', len(folds), len(missing))
+        
+        if missing and self.fold_store is not None:
+            stored = self.fold_store.get_many(missing, self._fold_store_params())
+            _count_lookups('fold_store', len(stored), len(missing) - len(stored))
+            for sequence, result in stored.items():
+                self.fold_cache.put(sequence, self.fold_params, result)
+            folds.update(stored)
+            missing = [sequence for sequence in missing if sequence not in stored]
+        
+        total = len(folds) + len(missing)
+        cached = len(folds)
+        if progress is not None:
+            progress(cached, total)
+        
+        FOLD_CALLS.inc(len(missing), system=current_system())
+        if missing:
+            report = None if progress is None else (lambda folded: progress(cached + folded, total))
+            computed = dict(zip(missing, self.fold_pool.fold(missing, self.fold_params, report)))
+            for sequence, result in computed.items():
+                self.fold_cache.put(sequence, self.fold_params, result)
+            folds.update(computed)
+            if self.fold_store is not None:
+                self.fold_store.put_many(computed, self._fold_store_params())
+        
+        return folds
+    
+    def _fold_store_params(self) -> Tuple:
+        """Fold store key: results are only reusable under the same engine and parameters."""
+        return (fold_engine(), self.fold_params)
+    
     def calculate_structure_score(self, sequence: str) -> Dict[str, Any]:
         """Calculate RNA structure score."""
-        structure, energy = RNA.fold(sequence)
+        return self._structure_score(*self.fold(sequence))
+    
+    def _structure_score(self, structure: Optional[str], energy: float) -> Dict[str, Any]:
+        """Turn a folding result into the structure score dict."""
         normalized_score = min(100, max(0, (abs(energy) / 30) * 100))
         return {
             'structure': structure,
@@ -149,10 +586,12 @@ class GuideRNAAnalyzer:
             'score': normalized_score
         }
     
-    def calculate_efficiency(self, guide: str) -> float:
+    def calculate_efficiency(self, guide: str, structure_score: Dict[str, Any] = None) -> float:
         """Calculate guide RNA efficiency score."""
         gc_content = self.calculate_gc_content(guide)
-        structure_score = self.calculate_structure_score(guide)['score']
+        if structure_score is None:
+            structure_score = self.calculate_structure_score(guide)
+        structure_score = structure_score['score']
         
         gc_weight = 0.6
         structure_weight = 0.4
@@ -162,27 +601,54 @@ class GuideRNAAnalyzer:
         final_score = (gc_score * gc_weight + structure_score * structure_weight)
         return round(final_score, 2)
     
-    def prepare_visualization_data(self, guides: list) -> Dict[str, list]:
-        """Prepare data for visualization."""
-        return {
-            'positions': [g['position'] for g in guides],
-            'scores': [g['efficiency_score'] for g in guides],
-            'gc_contents': [g['gc_content'] for g in guides]
-        }
+    def _efficiency_scores(self, gc_contents: np.ndarray, structure_scores: np.ndarray) -> np.ndarray:
+        """Vectorized calculate_efficiency for precomputed GC and structure scores."""
+        gc_scores = 100 - np.minimum(np.abs(gc_contents - 50), 50)
+        final_scores = gc_scores * 0.6 + structure_scores * 0.4
+        # Python's round() per value keeps scores identical to calculate_efficiency
+        return np.array([round(score, 2) for score in final_scores.tolist()], dtype=np.float64)
+    
+    def prepare_visualization_data(self, guides) -> Dict[str, Any]:
+        """Prepare data for visualization (at most CHART_MAX_POINTS points)."""
+        if not isinstance(guides, GuideSet):
+            guides = GuideSet.from_records(guides)
+        return guides.visualization_data(self.config.CHART_MAX_POINTS)
     
-    def calculate_statistics(self, guides: list) -> Dict[str, Any]:
+    def calculate_statistics(self, guides) -> Dict[str, Any]:
         """Calculate statistics for found guides."""
-        if not guides:
-            return {
-                'total_guides': 0,
-                'average_gc': 0,
-                'average_efficiency': 0,
-                'best_guide': None
-            }
-            
-        return {
-            'total_guides': len(guides),
-            'average_gc': round(sum(g['gc_content'] for g in guides) / len(guides), 2),
-            'average_efficiency': round(sum(g['efficiency_score'] for g in guides) / len(guides), 2),
-            'best_guide': max(guides, key=lambda x: x['efficiency_score'])
-        }
\ No newline at end of file
+        if not isinstance(guides, GuideSet):
+            guides = GuideSet.from_records(guides)
+        return guides.statistics()
+
+
+def _common_prefix_length(a: str, b: str) -> int:
+    """Length of the longest common prefix, by binary search over slice comparisons."""
+    low, high = 0, min(len(a), len(b))
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[:middle] == b[:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def _common_suffix_length(a: str, b: str) -> int:
+    """Length of the longest common suffix."""
+    low, high = 0, min(len(a), len(b))
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[len(a) - middle:] == b[len(b) - middle:]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def _count_lookups(cache: str, hits: int, misses: int) -> None:
+    """Record cache hits and misses for /metrics, labelled with the current system."""
+    system = current_system()
+    if hits:
+        CACHE_HITS.inc(hits, cache=cache, system=system)
+    if misses:
+        CACHE_MISSES.inc(misses, cache=cache, system=system)
@@ -0,0 +1,218 @@
+import io
+import math
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+
+def _column(values, dtype) -> np.ndarray:
+    """Build a read-only column array."""
+    array = np.array(values, dtype=dtype)
+    array.setflags(write=False)
+    return array
+
+
+class GuideSet:
+    """
+    Columnar collection of scored guides.
+
+    Each field lives in its own array, so statistics, filters and chart data
+    are computed with vectorized operations instead of repeated loops over a
+    list of dicts. Per-guide dicts in the shape the frontend expects are
+    only built at serialization time (`to_records`). Columns are read-only,
+    which keeps cached GuideSets safe to share between requests.
+
+    Guides that were not folded (see the analyzer's prefilter) have NaN
+    energy and scores, and serialize with null structure and efficiency.
+    Guides folded in fast mode have an energy and scores but no structure.
+    """
+
+    def __init__(self, sequences: Sequence[str], positions: Sequence[int], strands: Sequence[str],
+                 pams: Sequence[str], gc_contents: Sequence[float], structures: Sequence[str],
+                 energies: Sequence[float], structure_scores: Sequence[float],
+                 efficiency_scores: Sequence[float]):
+        self.sequences = _column(sequences, object)
+        self.positions = _column(positions, np.int64)
+        self.strands = _column(strands, '<U1')
+        self.pams = _column(pams, object)
+        self.gc_contents = _column(gc_contents, np.float64)
+        self.structures = _column(structures, object)
+        self.energies = _column(energies, np.float64)
+        self.structure_scores = _column(structure_scores, np.float64)
+        self.efficiency_scores = _column(efficiency_scores, np.float64)
+
+    @classmethod
+    def empty(cls) -> 'GuideSet':
+        return cls([], [], [], [], [], [], [], [], [])
+
+    @classmethod
+    def from_records(cls, guides: Sequence[Dict[str, Any]]) -> 'GuideSet':
+        """Build from the list-of-dicts representation."""
+        structures = [g['structure_score'] or {} for g in guides]
+        # None becomes NaN in the float columns
+        return cls(
+            [g['sequence'] for g in guides],
+            [g['position'] for g in guides],
+            [g.get('strand', '+') for g in guides],
+            [g['pam'] for g in guides],
+            [g['gc_content'] for g in guides],
+            [s.get('structure') for s in structures],
+            [s.get('energy') for s in structures],
+            [s.get('score') for s in structures],
+            [g['efficiency_score'] for g in guides]
+        )
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    @property
+    def folded(self) -> np.ndarray:
+        """Boolean mask of guides that were folded, i.e. have an energy and efficiency score."""
+        return ~np.isnan(self.energies)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self.to_records())
+
+    def __getitem__(self, index: int) -> Dict[str, Any]:
+        return self.to_records([index])[0]
+
+    def __sizeof__(self) -> int:
+        """Approximate memory use, for size-bounded caches."""
+        strings = sum(len(s) for column in (self.sequences, self.pams, self.structures) for s in column if s)
+        arrays = sum(column.nbytes for column in (self.positions, self.strands, self.gc_contents,
+                                                   self.energies, self.structure_scores,
+                                                   self.efficiency_scores))
+        # ~50 bytes of object overhead per string
+        return object.__sizeof__(self) + arrays + strings + 3 * 50 * len(self)
+
+    def take(self, indices: Sequence[int]) -> 'GuideSet':
+        """Subset (or reorder) guides by index."""
+        indices = np.asarray(indices, dtype=np.int64)
+        return GuideSet(
+            self.sequences[indices], self.positions[indices], self.strands[indices],
+            self.pams[indices], self.gc_contents[indices], self.structures[indices],
+            self.energies[indices], self.structure_scores[indices], self.efficiency_scores[indices]
+        )
+
+    def to_records(self, indices: Optional[Sequence[int]] = None) -> List[Dict[str, Any]]:
+        """Serialize guides (all, or the given indices) to the API's dict shape."""
+        guides = self if indices is None else self.take(indices)
+        return [
+            {
+                'sequence': sequence,
+                'position': position,
+                'strand': strand,
+                'pam': pam,
+                'gc_content': gc_content,
+                'structure_score': None if math.isnan(energy) else {
+                    'structure': structure,
+                    'energy': energy,
+                    'score': score
+                },
+                'efficiency_score': None if math.isnan(efficiency_score) else efficiency_score
+            }
+            for sequence, position, strand, pam, gc_content, structure, energy, score, efficiency_score
+            in zip(guides.sequences.tolist(), guides.positions.tolist(), guides.strands.tolist(),
+                   guides.pams.tolist(), guides.gc_contents.tolist(), guides.structures.tolist(),
+                   guides.energies.tolist(), guides.structure_scores.tolist(),
+                   guides.efficiency_scores.tolist())
+        ]
+
+    def to_bytes(self) -> bytes:
+        """
+        Compact binary form for on-disk stores: the numeric columns as raw
+        arrays and the text columns newline-joined (unfolded or fast-mode
+        structures as empty lines), in an uncompressed .npz.
+        """
+        def text(values) -> np.ndarray:
+            return np.frombuffer('\n'.join(values).encode(), dtype=np.uint8)
+
+        buffer = io.BytesIO()
+        np.savez(
+            buffer,
+            sequences=text(self.sequences.tolist()),
+            positions=self.positions,
+            strands=text(self.strands.tolist()),
+            pams=text(self.pams.tolist()),
+            gc_contents=self.gc_contents,
+            structures=text([structure or '' for structure in self.structures.tolist()]),
+            energies=self.energies,
+            structure_scores=self.structure_scores,
+            efficiency_scores=self.efficiency_scores
+        )
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'GuideSet':
+        """Inverse of to_bytes."""
+        columns = np.load(io.BytesIO(data), allow_pickle=False)
+        count = len(columns['positions'])
+
+        def text(name: str) -> List[str]:
+            return columns[name].tobytes().decode().split('\n') if count else []
+
+        return cls(
+            text('sequences'), columns['positions'], text('strands'), text('pams'),
+            columns['gc_contents'], [structure or None for structure in text('structures')],
+            columns['energies'], columns['structure_scores'], columns['efficiency_scores']
+        )
+
+    def statistics(self) -> Dict[str, Any]:
+        """Summary statistics for the set; efficiency only covers folded guides."""
+        count = len(self)
+        if not count:
+            return {
+                'total_guides': 0,
+                'average_gc': 0,
+                'average_efficiency': 0,
+                'best_guide': None
+            }
+
+        folded = self.folded
+        scored = int(folded.sum())
+        if scored:
+            average_efficiency = round(float(self.efficiency_scores[folded].sum()) / scored, 2)
+            best_guide = self[int(np.nanargmax(self.efficiency_scores))]
+        else:
+            average_efficiency = None
+            best_guide = None
+
+        return {
+            'total_guides': count,
+            'average_gc': round(float(self.gc_contents.sum()) / count, 2),
+            'average_efficiency': average_efficiency,
+            'best_guide': best_guide
+        }
+
+    def visualization_data(self, max_points: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Chart data: position, efficiency and GC for every guide. Sets larger
+        than max_points are split into max_points equal position bins and only
+        the best guide of each bin is plotted, so chart data stays the same
+        size whatever the input length.
+        """
+        guides, bin_size = self, None
+        if max_points and len(self) > max_points:
+            span = int(self.positions.max()) + 1
+            bins = self.positions * max_points // span
+            # Bin by bin, best score first (unfolded guides last); the
+            # stable sort keeps the leftmost of equal scores
+            scores = np.nan_to_num(self.efficiency_scores, nan=-np.inf)
+            order = np.lexsort((-scores, bins))
+            best = order[np.unique(bins[order], return_index=True)[1]]
+            guides, bin_size = self.take(np.sort(best)), -(-span // max_points)
+        return {
+            'positions': guides.positions.tolist(),
+            'scores': [None if math.isnan(score) else score for score in guides.efficiency_scores.tolist()],
+            'gc_contents': guides.gc_contents.tolist(),
+            'bin_size': bin_size
+        }
+
+
+def json_default(value: Any) -> Any:
+    """`default` hook for JSON encoders: GuideSets and NumPy scalars."""
+    if isinstance(value, GuideSet):
+        return value.to_records()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
@@ -0,0 +1,249 @@
+import json
+import logging
+import sqlite3
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from threading import Lock
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from app.guide_set import json_default
+
+logger = logging.getLogger(__name__)
+
+# Job states
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    """Raised inside a running analysis when its job has been cancelled."""
+
+
+class JobStore:
+    """
+    SQLite-backed job state. Every gunicorn worker on the host opens the same
+    file, so a job can be polled, fetched or cancelled through any of them.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with closing(self._connect()) as db, db:
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('''
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    system TEXT NOT NULL,
+                    sequence_length INTEGER NOT NULL,
+                    folded INTEGER NOT NULL DEFAULT 0,
+                    total INTEGER NOT NULL DEFAULT 0,
+                    cancel_requested INTEGER NOT NULL DEFAULT 0,
+                    error TEXT,
+                    result TEXT,
+                    result_key TEXT,
+                    sequence_info TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            ''')
+
+    def _connect(self) -> sqlite3.Connection:
+        # Short-lived connections keep this safe across threads and processes
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _execute(self, query: str, params: tuple = ()) -> int:
+        with closing(self._connect()) as db, db:
+            return db.execute(query, params).rowcount
+
+    def create(self, system: str, sequence_length: int) -> str:
+        """Register a new pending job and return its id."""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        self._execute(
+            'INSERT INTO jobs (id, status, system, sequence_length, created_at, updated_at) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            (job_id, PENDING, system, sequence_length, now, now)
+        )
+        return job_id
+
+    def set_status(self, job_id: str, status: str, error: Optional[str] = None,
+                   result: Optional[str] = None, result_key: Optional[str] = None,
+                   sequence_info: Optional[str] = None) -> None:
+        self._execute(
+            'UPDATE jobs SET status = ?, error = ?, result = ?, result_key = ?, sequence_info = ?, '
+            'updated_at = ? WHERE id = ?',
+            (status, error, result, result_key, sequence_info, time.time(), job_id)
+        )
+
+    def set_progress(self, job_id: str, folded: int, total: int) -> bool:
+        """Record progress; returns True if cancellation has been requested."""
+        with closing(self._connect()) as db, db:
+            db.execute(
+                'UPDATE jobs SET folded = ?, total = ?, updated_at = ? WHERE id = ?',
+                (folded, total, time.time(), job_id)
+            )
+            row = db.execute('SELECT cancel_requested FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return bool(row and row[0])
+
+    def request_cancel(self, job_id: str) -> bool:
+        """Flag a job for cancellation; False if it has already finished."""
+        with closing(self._connect()) as db, db:
+            updated = db.execute(
+                'UPDATE jobs SET cancel_requested = 1, updated_at = ? '
+                'WHERE id = ? AND status NOT IN (?, ?, ?)',
+                (time.time(), job_id) + FINISHED_STATES
+            ).rowcount
+            # Jobs still waiting in the queue can be cancelled right away
+            db.execute(
+                'UPDATE jobs SET status = ? WHERE id = ? AND status = ?',
+                (CANCELLED, job_id, PENDING)
+            )
+        return bool(updated)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Job status and progress, without the result."""
+        with closing(self._connect()) as db:
+            row = db.execute(
+                'SELECT id, status, system, sequence_length, folded, total, error, created_at, updated_at '
+                'FROM jobs WHERE id = ?', (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        job_id, status, system, sequence_length, folded, total, error, created_at, updated_at = row
+        return {
+            'job_id': job_id,
+            'status': status,
+            'system': system,
+            'sequence_length': sequence_length,
+            'progress': {
+                'folded': folded,
+                'total': total,
+                'percent': round(folded / total * 100, 1) if total else 0
+            },
+            'error': error,
+            'created_at': created_at,
+            'updated_at': updated_at
+        }
+
+    def get_result(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Serialized result JSON of a finished job, with the analyzer cache key
+        and sequence metadata it was stored under.
+        """
+        with closing(self._connect()) as db:
+            row = db.execute(
+                'SELECT result, result_key, sequence_info FROM jobs WHERE id = ?', (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        result, result_key, sequence_info = row
+        return {
+            'result': result,
+            'result_key': result_key,
+            'sequence_info': json.loads(sequence_info) if sequence_info else None
+        }
+
+    def purge(self, max_age: float) -> int:
+        """Delete finished jobs older than max_age seconds."""
+        return self._execute(
+            'DELETE FROM jobs WHERE status IN (?, ?, ?) AND updated_at < ?',
+            FINISHED_STATES + (time.time() - max_age,)
+        )
+
+
+class JobManager:
+    """
+    Runs long analyses and batches on a local thread pool and tracks them
+    in a JobStore.
+
+    Jobs run on background threads so the request that submitted them can
+    return immediately; set FOLD_WORKERS to spread the folding itself over
+    processes (batches use the BatchRunner's process pool). Progress is
+    reported as guides folded / total, or for batches as distinct sequences
+    analyzed / total.
+    """
+
+    def __init__(self, analyzer, store: JobStore, workers: int = 2, retention: float = 3600,
+                 batch_runner=None):
+        self.analyzer = analyzer
+        self.store = store
+        self.workers = workers
+        self.retention = retention
+        self.batch_runner = batch_runner
+        self._executor = None
+        self._lock = Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                    thread_name_prefix='analysis-job')
+            return self._executor
+
+    def submit(self, sequence: str, system: str, sequence_info: Optional[Dict] = None) -> str:
+        """Queue an analysis and return its job id."""
+        self.store.purge(self.retention)
+        job_id = self.store.create(system, len(sequence))
+        self._get_executor().submit(self._run, job_id, sequence, system, sequence_info)
+        return job_id
+
+    def submit_batch(self, entries: Sequence[Dict[str, Any]], systems: List[str]) -> str:
+        """
+        Queue a batch (validated record entries, see BatchRunner.run) and
+        return its job id. The job is stored with its systems joined by
+        commas and no result key.
+        """
+        self.store.purge(self.retention)
+        sequences = {entry['sequence']['sequence'] for entry in entries if entry['valid']}
+        job_id = self.store.create(','.join(systems), sum(map(len, sequences)))
+        self._get_executor().submit(self._run_batch, job_id, entries, systems)
+        return job_id
+
+    def _run(self, job_id: str, sequence: str, system: str, sequence_info: Optional[Dict]) -> None:
+        def analyze(progress):
+            results = dict(self.analyzer.analyze_sequence(sequence, system, progress))
+            if sequence_info is not None:
+                results['sequence_info'] = sequence_info
+            return {
+                'result': json.dumps(results, default=json_default),
+                'result_key': self.analyzer.cache.make_key(sequence, system),
+                'sequence_info': json.dumps(sequence_info) if sequence_info is not None else None
+            }
+        self._execute(job_id, analyze)
+
+    def _run_batch(self, job_id: str, entries: Sequence[Dict[str, Any]], systems: List[str]) -> None:
+        def analyze(progress):
+            outcomes = self.batch_runner.run(entries, systems, progress)
+            return {'result': json.dumps({'records': outcomes, 'systems': systems}, default=json_default)}
+        self._execute(job_id, analyze)
+
+    def _execute(self, job_id: str, analyze: Callable[[Callable[[int, int], None]], Dict[str, Any]]) -> None:
+        """Run a job's analysis, storing the columns it returns once done."""
+        job = self.store.get(job_id)
+        if job is None or job['status'] == CANCELLED:
+            return
+        self.store.set_status(job_id, RUNNING)
+
+        def progress(done: int, total: int) -> None:
+            if self.store.set_progress(job_id, done, total):
+                raise JobCancelled()
+
+        try:
+            self.store.set_status(job_id, DONE, **analyze(progress))
+        except JobCancelled:
+            self.store.set_status(job_id, CANCELLED)
+        except Exception as e:
+            logger.exception('Job %s failed', job_id)
+            self.store.set_status(job_id, FAILED, error=str(e))
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
@@ -0,0 +1,210 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from threading import Lock
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# Stage timings of the current request (None when nobody is collecting)
+_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar('stage_timings', default=None)
+# CRISPR system the current analysis is for, used as a metric label
+_system: ContextVar[str] = ContextVar('metrics_system', default='')
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+GUIDE_BUCKETS = (0, 10, 50, 100, 500, 1000, 5000, 10000, 50000, 100000, 500000)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter, one series per label combination."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = Lock()
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def values(self) -> Dict[Tuple[str, ...], float]:
+        """Current value of every series, keyed by label values."""
+        with self._lock:
+            return dict(self._values)
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}')
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram, one series per label combination."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            # [bucket counts..., sum, count]
+            series = self._series.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, series):
+                    labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                    lines.append(f'{self.name}_bucket{labels} {count}')
+                labels = _format_labels(self.labelnames, key)
+                lines.append(f'{self.name}_sum{labels} {_format_value(series[-2])}')
+                lines.append(f'{self.name}_count{labels} {series[-1]}')
+        return lines
+
+
+class Gauge:
+    """Gauge read from a callback at scrape time; returns (label values, value) pairs."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str],
+                 collect: Callable[[], Iterable[Tuple[Sequence[str], float]]]):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.collect = collect
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} gauge']
+        for key, value in self.collect():
+            lines.append(f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}')
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Metrics rendered in the Prometheus text exposition format.
+    Values are per process; with several gunicorn workers each one reports
+    its own series, which Prometheus aggregates.
+    """
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    'crispradium_stage_seconds', 'Time spent in each analysis stage.', ('stage', 'system')))
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    'crispradium_request_seconds', 'HTTP request latency.', ('endpoint', 'status')))
+GUIDES_PER_ANALYSIS = REGISTRY.register(Histogram(
+    'crispradium_guides_per_analysis', 'Guides returned per analysis.', ('system',), GUIDE_BUCKETS))
+FOLD_CALLS = REGISTRY.register(Counter(
+    'crispradium_fold_calls_total', 'RNA folds computed (fold cache misses).', ('system',)))
+FOLDS_AVOIDED = REGISTRY.register(Counter(
+    'crispradium_folds_avoided_total', 'Candidates the prefilter kept from being folded.', ('system',)))
+GUIDES_REUSED = REGISTRY.register(Counter(
+    'crispradium_guides_reused_total', 'Guides carried over from a similar recent input.', ('system',)))
+CACHE_HITS = REGISTRY.register(Counter(
+    'crispradium_cache_hits_total', 'Cache lookups that found an entry.', ('cache', 'system')))
+CACHE_MISSES = REGISTRY.register(Counter(
+    'crispradium_cache_misses_total', 'Cache lookups that found nothing.', ('cache', 'system')))
+REQUEST_ERRORS = REGISTRY.register(Counter(
+    'crispradium_request_errors_total', 'Requests that failed with a server error.', ('endpoint',)))
+
+
+def start_timings() -> Tuple[Dict[str, float], Token]:
+    """Start collecting stage timings (seconds) recorded in this context."""
+    timings = {}
+    return timings, _timings.set(timings)
+
+
+def stop_timings(token: Token) -> None:
+    _timings.reset(token)
+
+
+@contextmanager
+def collect_timings() -> Iterator[Dict[str, float]]:
+    """Collect stage timings recorded inside the block into a dict."""
+    timings, token = start_timings()
+    try:
+        yield timings
+    finally:
+        stop_timings(token)
+
+
+@contextmanager
+def system_label(system: str) -> Iterator[None]:
+    """Label the stages and counters recorded in this context with a CRISPR system."""
+    token = _system.set(system)
+    try:
+        yield
+    finally:
+        _system.reset(token)
+
+
+def current_system() -> str:
+    return _system.get()
+
+
+@contextmanager
+def stage(name: str, system: Optional[str] = None) -> Iterator[None]:
+    """
+    Time a block as an analysis stage, for /metrics and the request's
+    timings. The system label defaults to the one set by system_label.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=name, system=_system.get() if system is None else system)
+        timings = _timings.get()
+        if timings is not None:
+            timings[name] = timings.get(name, 0.0) + elapsed
+
+
+def server_timing(timings: Dict[str, float]) -> str:
+    """Format timings as a Server-Timing header value (durations in ms)."""
+    return ', '.join(f'{name};dur={seconds * 1000:.2f}' for name, seconds in timings.items())
@@ -0,0 +1,105 @@
+from typing import Dict, Iterable, List, NamedTuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from app.pam_scanner import reverse_complement
+from app.packed_sequence import PackedSequence
+
+
+class OffTargetSite(NamedTuple):
+    """A window within `max_mismatches` of a guide."""
+    position: int    # window start on the forward strand (0-based)
+    strand: str      # '+' or '-'
+    sequence: str    # site as read 5'->3' on its own strand
+    mismatches: int
+
+
+class SeedIndex:
+    """
+    k-mer seed index over a target sequence for bounded-mismatch search.
+
+    Uses the pigeonhole principle: if a guide is split into
+    max_mismatches + 1 segments, any site with at most max_mismatches
+    mismatches matches at least one segment exactly. Only windows that share
+    an exact seed with the guide are verified, instead of every window.
+    The reverse strand is searched with the guide's reverse complement
+    against the same forward index.
+    """
+
+    def __init__(self, sequence: str, seed_length: int = 5):
+        self.sequence = sequence
+        self.seed_length = seed_length
+        self.packed = PackedSequence.from_string(sequence)
+
+        # Seeds are numbered in base 5 (A, C, G, T, N) so N matches N exactly,
+        # as it does in a plain string comparison. Positions are sorted by seed
+        # id and looked up with a binary search.
+        ids = self._seed_ids(self.packed)
+        self.positions = np.argsort(ids, kind='stable')
+        self.sorted_ids = ids[self.positions]
+
+    def _seed_ids(self, packed: PackedSequence) -> np.ndarray:
+        """Seed id of every k-mer in packed, indexed by start."""
+        if len(packed) < self.seed_length:
+            return np.zeros(0, dtype=np.int64)
+        symbols = packed.codes.astype(np.int64) + 4 * packed.masked
+        weights = 5 ** np.arange(self.seed_length - 1, -1, -1, dtype=np.int64)
+        return sliding_window_view(symbols, self.seed_length) @ weights
+
+    def search(self, guide: str, max_mismatches: int = 3) -> List[OffTargetSite]:
+        """
+        Find sites within max_mismatches of guide on both strands.
+
+        Order and contents match the brute-force scan: forward windows by
+        position (including the on-target match), then reverse-strand
+        windows in reverse-complement order, excluding exact matches.
+        """
+        guide_length = len(guide)
+        forward = [
+            OffTargetSite(start, '+', self.sequence[start:start + guide_length], mismatches)
+            for start, mismatches in self._matches(guide, max_mismatches)
+        ]
+
+        reverse = []
+        for start, mismatches in reversed(self._matches(reverse_complement(guide), max_mismatches)):
+            if mismatches == 0:
+                continue
+            site = reverse_complement(self.sequence[start:start + guide_length])
+            reverse.append(OffTargetSite(start, '-', site, mismatches))
+
+        return forward + reverse
+
+    def search_many(self, guides: Iterable[str], max_mismatches: int = 3) -> Dict[str, List[OffTargetSite]]:
+        """Search a batch of guides against the same index."""
+        return {guide: self.search(guide, max_mismatches) for guide in dict.fromkeys(guides)}
+
+    def _matches(self, query: str, max_mismatches: int) -> List[tuple]:
+        """Return sorted (start, mismatches) for forward windows close to query."""
+        query_length = len(query)
+        last_start = len(self.sequence) - query_length
+        if last_start < 0:
+            return []
+
+        query_packed = PackedSequence.from_string(query)
+        segments = max_mismatches + 1
+        if query_length // segments < self.seed_length:
+            # Segments shorter than a seed can't use the index
+            starts = None
+        else:
+            query_ids = self._seed_ids(query_packed)
+            hits = []
+            for segment in range(segments):
+                offset = segment * query_length // segments
+                seed_id = query_ids[offset]
+                left = np.searchsorted(self.sorted_ids, seed_id, side='left')
+                right = np.searchsorted(self.sorted_ids, seed_id, side='right')
+                hits.append(self.positions[left:right] - offset)
+            starts = np.unique(np.concatenate(hits))
+            starts = starts[(starts >= 0) & (starts <= last_start)]
+
+        mismatches = self.packed.window_mismatches(query_packed, starts)
+        if starts is None:
+            starts = np.arange(last_start + 1)
+        close = mismatches <= max_mismatches
+        return list(zip(starts[close].tolist(), mismatches[close].tolist()))
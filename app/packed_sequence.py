@@ -0,0 +1,136 @@
+from typing import Optional, Union
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# ASCII -> 2-bit code (A=0, C=1, G=2, T=3). Anything else is treated as N:
+# code 0 with the mask bit set, so N never compares equal to A.
+_CODES = np.zeros(256, dtype=np.uint8)
+_MASKED = np.ones(256, dtype=np.uint8)
+for _code, _bases in enumerate(('Aa', 'Cc', 'Gg', 'Tt')):
+    for _base in _bases:
+        _CODES[ord(_base)] = _code
+        _MASKED[ord(_base)] = 0
+
+_LETTERS = np.frombuffer(b'ACGT', dtype=np.uint8)
+_SHIFTS = np.array([0, 2, 4, 6], dtype=np.uint8)
+
+
+def _pack(values: np.ndarray) -> np.ndarray:
+    """Pack 2-bit values, 4 per byte, first base in the lowest bits."""
+    padded = np.zeros((len(values) + 3) // 4 * 4, dtype=np.uint8)
+    padded[:len(values)] = values
+    quads = padded.reshape(-1, 4)
+    return quads[:, 0] | (quads[:, 1] << 2) | (quads[:, 2] << 4) | (quads[:, 3] << 6)
+
+
+def _unpack(packed: np.ndarray, length: int) -> np.ndarray:
+    """Inverse of _pack."""
+    return ((packed[:, None] >> _SHIFTS) & 3).ravel()[:length]
+
+
+class PackedSequence:
+    """
+    DNA sequence stored at 2 bits per base.
+
+    `packed` holds the base codes and `mask` marks N (and any non-ACGT)
+    bases in the same 2-bit layout, so sequences can be compared with a
+    byte-wise XOR and popcount. Masked bases have code 0.
+    """
+
+    def __init__(self, packed: np.ndarray, mask: np.ndarray, length: int):
+        self.packed = packed
+        self.mask = mask
+        self.length = length
+        self._codes = None
+        self._masked = None
+
+    @classmethod
+    def from_string(cls, sequence: str) -> 'PackedSequence':
+        """Encode a DNA string."""
+        raw = np.frombuffer(sequence.encode('ascii'), dtype=np.uint8)
+        masked = _MASKED[raw]
+        codes = _CODES[raw]
+        return cls(_pack(codes), _pack(masked), len(raw))
+
+    @classmethod
+    def from_codes(cls, codes: np.ndarray, masked: np.ndarray) -> 'PackedSequence':
+        """Build from unpacked per-base codes and N flags."""
+        codes = np.where(masked, 0, codes).astype(np.uint8)
+        return cls(_pack(codes), _pack(masked.astype(np.uint8)), len(codes))
+
+    def __len__(self) -> int:
+        return self.length
+
+    @property
+    def codes(self) -> np.ndarray:
+        """Per-base 2-bit codes (uint8), unpacked on first use."""
+        if self._codes is None:
+            self._codes = _unpack(self.packed, self.length)
+        return self._codes
+
+    @property
+    def masked(self) -> np.ndarray:
+        """Per-base N flags (bool)."""
+        if self._masked is None:
+            self._masked = _unpack(self.mask, self.length).astype(bool)
+        return self._masked
+
+    def to_string(self) -> str:
+        """Decode back to an uppercase DNA string."""
+        letters = _LETTERS[self.codes]
+        letters[self.masked] = ord('N')
+        return letters.tobytes().decode('ascii')
+
+    def reverse_complement(self) -> 'PackedSequence':
+        """Reverse complement; complement is 3 - code in this encoding."""
+        return PackedSequence.from_codes(3 - self.codes[::-1], self.masked[::-1])
+
+    def gc_count(self) -> int:
+        """Number of G/C bases."""
+        codes = self.codes
+        return int(np.count_nonzero((codes == 1) | (codes == 2)))
+
+    def gc_content(self) -> float:
+        """GC content percentage."""
+        return (self.gc_count() / self.length) * 100 if self.length else 0
+
+    def window_gc_counts(self, window: int) -> np.ndarray:
+        """G/C count of every window of the given size, indexed by start."""
+        if window > self.length:
+            return np.zeros(0, dtype=np.int64)
+        codes = self.codes
+        cumulative = np.concatenate(([0], np.cumsum((codes == 1) | (codes == 2), dtype=np.int64)))
+        return cumulative[window:] - cumulative[:-window]
+
+    def window_gc_content(self, window: int) -> np.ndarray:
+        """GC percentage of every window of the given size, indexed by start."""
+        return (self.window_gc_counts(window) / window) * 100
+
+    def mismatches(self, other: 'PackedSequence') -> int:
+        """Hamming distance to an equal-length sequence via XOR/popcount."""
+        if other.length != self.length:
+            raise ValueError('Sequences must have the same length')
+        diff = self.packed ^ other.packed
+        # Fold each 2-bit pair onto its low bit, then add N/base disagreements
+        diff = ((diff | (diff >> 1)) & 0x55) | (self.mask ^ other.mask)
+        return int(np.bitwise_count(diff).sum())
+
+    def window_mismatches(self, query: Union['PackedSequence', str],
+                          starts: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Mismatch count between query and the window at each start
+        (every window when starts is None).
+        """
+        if isinstance(query, str):
+            query = PackedSequence.from_string(query)
+        if query.length > self.length:
+            return np.zeros(0, dtype=np.int64)
+
+        windows = sliding_window_view(self.codes, query.length)
+        masked = sliding_window_view(self.masked, query.length)
+        if starts is not None:
+            windows = windows[starts]
+            masked = masked[starts]
+        diff = (windows ^ query.codes).astype(bool) | (masked ^ query.masked)
+        return np.count_nonzero(diff, axis=1)
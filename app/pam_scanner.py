@@ -0,0 +1,96 @@
+import re
+from typing import List, NamedTuple
+
+# IUPAC nucleotide codes -> regex character classes
+IUPAC_CODES = {
+    'N': '[ATGC]',
+    'R': '[AG]',
+    'Y': '[CT]',
+    'M': '[AC]',
+    'K': '[GT]',
+    'S': '[GC]',
+    'W': '[AT]',
+    'H': '[ACT]',
+    'B': '[CGT]',
+    'V': '[ACG]',
+    'D': '[AGT]'
+}
+
+# Complement table that also covers the IUPAC ambiguity codes, so the same
+# translation works for sequences and PAM definitions
+COMPLEMENT = str.maketrans('ACGTNRYMKSWHBVD', 'TGCANYRKMSWDVBH')
+
+
+def reverse_complement(sequence: str) -> str:
+    """Return reverse complement of a DNA (or IUPAC) sequence."""
+    return sequence.translate(COMPLEMENT)[::-1]
+
+
+def pam_to_regex(pam: str) -> str:
+    """Convert an IUPAC PAM definition to a regex fragment."""
+    return ''.join(IUPAC_CODES.get(c, c) for c in pam.upper())
+
+
+class PamSite(NamedTuple):
+    """A candidate target site found by the scanner."""
+    position: int  # protospacer start on the forward strand (0-based)
+    strand: str    # '+' or '-'
+    guide: str     # protospacer, 5'->3' on its own strand
+    pam: str       # PAM, 5'->3' on the same strand as the guide
+
+
+class PamScanner:
+    """
+    Finds every PAM-adjacent protospacer on both strands in a single pass.
+
+    The PAM is compiled once into one regex that looks ahead for the forward
+    PAM and for its reverse complement at every offset, so overlapping sites
+    (e.g. NG in GGG) are all reported without slicing the sequence per offset.
+    """
+
+    def __init__(self, pam: str, guide_length: int):
+        self.pam = pam.upper()
+        self.pam_length = len(self.pam)
+        self.guide_length = guide_length
+
+        forward = pam_to_regex(self.pam)
+        reverse = pam_to_regex(reverse_complement(self.pam))
+        # group 1: forward PAM, group 2: reverse PAM at the same offset,
+        # group 3: reverse PAM when there is no forward PAM
+        self.pattern = re.compile(f'(?=({forward}))(?=({reverse}))?|(?=({reverse}))')
+
+    def scan(self, sequence: str) -> List[PamSite]:
+        """Return all candidate sites ordered by position, '+' before '-'."""
+        guide_length = self.guide_length
+        pam_length = self.pam_length
+        sequence_length = len(sequence)
+        forward_sites = []
+        reverse_sites = []
+
+        for match in self.pattern.finditer(sequence):
+            offset = match.start()
+            forward_pam = match.group(1)
+            reverse_pam = match.group(2) or match.group(3)
+
+            # Forward strand: 5'-[guide][PAM]-3'
+            if forward_pam is not None and offset >= guide_length:
+                start = offset - guide_length
+                forward_sites.append(PamSite(
+                    start, '+', sequence[start:offset], forward_pam
+                ))
+
+            # Reverse strand: the PAM's reverse complement sits left of the
+            # protospacer on the forward strand
+            if reverse_pam is not None:
+                start = offset + pam_length
+                end = start + guide_length
+                if end <= sequence_length:
+                    reverse_sites.append(PamSite(
+                        start, '-',
+                        reverse_complement(sequence[start:end]),
+                        reverse_complement(reverse_pam)
+                    ))
+
+        sites = forward_sites + reverse_sites
+        sites.sort(key=lambda site: (site.position, site.strand))
+        return sites
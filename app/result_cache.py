@@ -0,0 +1,166 @@
+import hashlib
+import sys
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+SCALARS = (str, int, float, bool, type(None))
+
+
+class FrozenDict(dict):
+    """
+    Read-only dict used for cached results. Still a dict, so it serializes
+    with jsonify as usual; take a copy with dict(...) to add fields.
+    """
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError('Cached analysis results are read-only; copy them with dict() first')
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __reduce__(self):
+        return (FrozenDict, (dict(self),))
+
+
+def _is_column(value: Any) -> bool:
+    """A list or tuple of scalars, like the chart data columns (judged by its first item)."""
+    return isinstance(value, (list, tuple)) and (not value or isinstance(value[0], SCALARS))
+
+
+def freeze(value: Any) -> Any:
+    """
+    Recursively turn dicts into FrozenDicts and lists into tuples. Columns
+    of scalars become tuples in one pass and arrays are made read-only, so
+    large results aren't walked item by item.
+    """
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    if _is_column(value):
+        return tuple(value)
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    if isinstance(value, np.ndarray) and value.flags.writeable:
+        value = value.view()
+        value.setflags(write=False)
+    return value
+
+
+def estimate_size(value: Any) -> int:
+    """Rough deep size of a result in bytes."""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(estimate_size(key) + estimate_size(item) for key, item in value.items())
+    elif _is_column(value):
+        # Length times the size of the first item, not a walk over every item
+        size += len(value) * sys.getsizeof(value[0]) if value else 0
+    elif isinstance(value, (list, tuple)):
+        size += sum(estimate_size(item) for item in value)
+    elif isinstance(value, np.ndarray) and value.base is not None:
+        # getsizeof only counts the buffer of arrays that own it
+        size += value.nbytes
+    return size
+
+
+class ResultCache:
+    """
+    Analysis result cache bounded by estimated size in bytes, with TTL expiry.
+
+    Keys are SHA-256 digests of the input rather than the raw sequence, so a
+    200kb sequence doesn't sit in memory once per key. Stored results are
+    frozen, which means callers can't mutate what other requests will get.
+    """
+
+    def __init__(self, max_bytes: int, ttl: float):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, size, value)
+        self._lock = Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def make_key(sequence: str, system: str) -> str:
+        """Digest of the input sequence and the CRISPR system."""
+        digest = hashlib.sha256()
+        digest.update(system.encode())
+        digest.update(b'\0')
+        digest.update(sequence.encode())
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return a cached result, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, size, value = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: str, value: Any) -> Any:
+        """Freeze and store a result; returns the frozen value."""
+        value = freeze(value)
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            # Would evict everything else and still not fit
+            return value
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, size, value)
+            self.bytes += size
+            self._evict()
+        return value
+
+    def _remove(self, key: str) -> None:
+        _, size, _ = self._entries.pop(key)
+        self.bytes -= size
+
+    def _evict(self) -> None:
+        """Drop expired entries first, then least recently used ones."""
+        now = time.monotonic()
+        for key in [k for k, (expires_at, _, _) in self._entries.items() if expires_at <= now]:
+            self._remove(key)
+            self.expirations += 1
+        while self.bytes > self.max_bytes and self._entries:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop all entries and reset counters."""
+        with self._lock:
+            self._entries.clear()
+            self.bytes = self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return entry count, size and hit/eviction counters."""
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'bytes': self.bytes,
+            'max_bytes': self.max_bytes,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0,
+            'evictions': self.evictions,
+            'expirations': self.expirations
+        }
@@ -0,0 +1,125 @@
+import json
+import logging
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from threading import Lock
+from typing import Any, Dict, Mapping, Optional
+
+from app.guide_set import GuideSet, json_default
+
+logger = logging.getLogger(__name__)
+
+
+class ResultStore:
+    """
+    Analysis results shared by every worker on the host, for paging.
+
+    The in-memory ResultCache is per process, so a "load more" request
+    served by another gunicorn worker would not find the result its cursor
+    points at. Results that are sent a page at a time are also written here
+    (SQLite, keyed by the analyzer cache key and settings), and read back
+    when the local cache misses. Rows expire after `ttl` seconds, like the
+    local cache.
+
+    Guides are stored in GuideSet's compact binary form, the rest of the
+    result as JSON. Writes run on a background thread, off the request
+    path, and a process doesn't rewrite a key it wrote in the last ttl / 2
+    seconds. The store is only an optimization: database errors are logged
+    and treated as misses.
+    """
+
+    def __init__(self, path: str, ttl: float = 3600):
+        self.path = path
+        self.ttl = ttl
+        self._written: Dict[str, float] = {}
+        self._executor = None
+        self._lock = Lock()
+        with closing(self._connect()) as db, db:
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('''
+                CREATE TABLE IF NOT EXISTS results (
+                    key TEXT PRIMARY KEY,
+                    meta TEXT NOT NULL,
+                    guides BLOB NOT NULL,
+                    stored_at REAL NOT NULL
+                )
+            ''')
+            db.execute('CREATE INDEX IF NOT EXISTS results_stored_at ON results (stored_at)')
+
+    def _connect(self) -> sqlite3.Connection:
+        # Short-lived connections keep this safe across threads and processes
+        db = sqlite3.connect(self.path, timeout=30)
+        db.execute('PRAGMA synchronous=NORMAL')
+        return db
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='result-store')
+            return self._executor
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """A stored result with its guides rebuilt as a GuideSet, or None."""
+        try:
+            with closing(self._connect()) as db:
+                row = db.execute('SELECT meta, guides FROM results WHERE key = ? AND stored_at >= ?',
+                                 (key, time.time() - self.ttl)).fetchone()
+        except sqlite3.Error:
+            logger.warning('Result store lookup failed', exc_info=True)
+            return None
+        if row is None:
+            return None
+        meta, guides = row
+        results = json.loads(meta)
+        results['guides'] = GuideSet.from_bytes(guides)
+        return results
+
+    def put(self, key: str, results: Mapping[str, Any]) -> None:
+        """Queue a write of a (read-only) result, replacing any stored under key."""
+        now = time.time()
+        with self._lock:
+            if self._written.get(key, 0) > now - self.ttl / 2:
+                return
+            self._written = {written: at for written, at in self._written.items() if at > now - self.ttl / 2}
+            self._written[key] = now
+        self._get_executor().submit(self._write, key, results)
+
+    def _write(self, key: str, results: Mapping[str, Any]) -> None:
+        now = time.time()
+        try:
+            guides = results['guides']
+            if not isinstance(guides, GuideSet):
+                guides = GuideSet.from_records(guides)
+            meta = json.dumps({name: value for name, value in results.items() if name != 'guides'},
+                              default=json_default)
+            with closing(self._connect()) as db, db:
+                db.execute('INSERT OR REPLACE INTO results (key, meta, guides, stored_at) VALUES (?, ?, ?, ?)',
+                           (key, meta, guides.to_bytes(), now))
+                db.execute('DELETE FROM results WHERE stored_at < ?', (now - self.ttl,))
+        except sqlite3.Error:
+            logger.warning('Result store write failed', exc_info=True)
+            with self._lock:
+                self._written.pop(key, None)
+
+    @staticmethod
+    def load(body: str) -> Dict[str, Any]:
+        """Parse a JSON analysis result (as jobs store them), guides as a GuideSet."""
+        results = json.loads(body)
+        results['guides'] = GuideSet.from_records(results['guides'])
+        return results
+
+    def clear(self) -> None:
+        """Drop all stored results."""
+        with closing(self._connect()) as db, db:
+            db.execute('DELETE FROM results')
+        with self._lock:
+            self._written.clear()
+
+    def shutdown(self) -> None:
+        """Finish queued writes and stop the writer thread."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
@@ -1,13 +1,163 @@
-from flask import render_template, request, jsonify
-from app import app, sequence_handler, guide_rna_analyzer
+from flask import (Blueprint, current_app, render_template, request, jsonify, Response, stream_with_context,
+                   url_for, g)
+from werkzeug.local import LocalProxy
+from app.jobs import DONE, FINISHED_STATES
+from app.guide_query import InvalidQuery, parse_guide_query, paginate, decode_cursor
+from app.result_store import ResultStore
+from app.metrics import (REGISTRY, REQUEST_SECONDS, REQUEST_ERRORS, stage, start_timings,
+                         stop_timings, server_timing)
+from app.compression import choose_encoding, compress
+import hashlib
+import io
+import json
+import time
 
-@app.route('/', methods=['GET'])
+bp = Blueprint('main', __name__)
+
+def _services():
+    """The analysis services of the current app (see app.services)."""
+    return current_app.extensions['crispradium']
+
+def _config():
+    return _services().config
+
+sequence_handler = LocalProxy(lambda: _services().sequence_handler)
+guide_rna_analyzer = LocalProxy(lambda: _services().analyzer)
+job_manager = LocalProxy(lambda: _services().job_manager)
+batch_runner = LocalProxy(lambda: _services().batch_runner)
+result_store = LocalProxy(lambda: _services().result_store)
+
+
+@bp.before_app_request
+def _start_request_timer():
+    g.request_start = time.perf_counter()
+    # Opt-in per-stage breakdown for this request
+    if _config().TIMING_HEADER_ENABLED and request.headers.get('X-Debug-Timing'):
+        g.timings, g.timings_token = start_timings()
+
+@bp.after_app_request
+def _record_request_metrics(response):
+    elapsed = time.perf_counter() - g.request_start
+    REQUEST_SECONDS.observe(elapsed, endpoint=request.endpoint or 'unknown', status=response.status_code)
+    if 'timings' in g:
+        response.headers['Server-Timing'] = server_timing({**g.timings, 'total': elapsed})
+    return response
+
+@bp.after_app_request
+def _compress_response(response):
+    """Compress large bodies for clients that accept it (runs before the timer hook)."""
+    config = _config()
+    if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in config.COMPRESS_MIMETYPES):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = choose_encoding(request.accept_encodings)
+    data = response.get_data()
+    if encoding is None or len(data) < config.COMPRESS_MIN_SIZE:
+        return response
+    with stage('compress'):
+        response.set_data(compress(data, encoding, config.GZIP_LEVEL, config.BROTLI_QUALITY))
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+@bp.teardown_app_request
+def _stop_request_timer(exc):
+    token = g.pop('timings_token', None)
+    if token is not None:
+        stop_timings(token)
+
+def _server_error(e: Exception):
+    """Log an unexpected failure and report it as a 500."""
+    current_app.logger.exception('Unhandled error in %s', request.endpoint)
+    REQUEST_ERRORS.inc(endpoint=request.endpoint)
+    return jsonify({
+        'error': str(e)
+    }), 500
+
+def _etag(*parts) -> str:
+    """
+    Content address of a response: a digest of the endpoint, its normalized
+    inputs and the analyzer settings. Identical requests get identical ETags
+    in every worker, before anything is analyzed.
+    """
+    digest = hashlib.sha256(f'{request.endpoint}\0{guide_rna_analyzer.fingerprint}'.encode())
+    for part in parts:
+        digest.update(b'\0')
+        digest.update(json.dumps(part, sort_keys=True, separators=(',', ':')).encode())
+    return digest.hexdigest()[:32]
+
+def _not_modified(etag: str):
+    """A 304 if the client already holds the response with this ETag, else None."""
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+        response.set_etag(etag, weak=True)
+        return response
+    return None
+
+def _tagged(response, etag: str):
+    # Weak, since the same body may be sent with different encodings
+    response.set_etag(etag, weak=True)
+    return response
+
+@bp.errorhandler(InvalidQuery)
+def _invalid_query(e: InvalidQuery):
+    return jsonify({
+        'error': str(e)
+    }), 400
+
+def _guide_query(args=None):
+    """
+    Filter, top-k and page-size parameters from the query string (or a
+    cursor's query). Raises InvalidQuery, answered with a 400 (call it
+    outside a catch-all try).
+    """
+    config = _config()
+    return parse_guide_query(request.args if args is None else args,
+                             config.GUIDE_PAGE_SIZE, config.MAX_GUIDE_PAGE_SIZE)
+
+def _paginate(results, result_key: str, query):
+    """
+    First page of a result. Results with more pages are shared through the
+    result store, so /guides can serve them from any worker.
+    """
+    page = paginate(results, result_key, query)
+    if page['page']['next_cursor']:
+        result_store.put(_store_key(result_key), results)
+    return page
+
+def _store_key(result_key: str) -> str:
+    """
+    Result store key: the analyzer cache key plus the analyzer settings, so
+    workers (or restarts) with other settings never page each other's results.
+    """
+    return f'{guide_rna_analyzer.fingerprint}:{result_key}'
+
+def _run_async(sequence: str, system: str) -> bool:
+    """Large inputs that aren't cached yet go to the job queue."""
+    return (len(sequence) >= _config().ASYNC_THRESHOLD
+            and system in guide_rna_analyzer.crispr_systems
+            and guide_rna_analyzer.get_cached_analysis(sequence, system) is None)
+
+def _job_accepted(job_id: str, **extra):
+    """202 response pointing the client at a submitted job."""
+    return jsonify({
+        'success': True,
+        'async': True,
+        'job_id': job_id,
+        'status_url': url_for('.job_status', job_id=job_id),
+        'result_url': url_for('.job_result', job_id=job_id),
+        **extra
+    }), 202
+
+@bp.route('/', methods=['GET'])
 def index():
     return render_template('index.html')
 
-@app.route('/analyze', methods=['POST'])
+@bp.route('/analyze', methods=['POST'])
 def analyze():
     """Analyze DNA sequence endpoint."""
+    query = _guide_query()
     try:
         data = request.get_json()
         sequence_input = data.get('sequence', '').strip()
@@ -24,34 +174,117 @@ def analyze():
         # For FASTA input, use the first sequence by default
         # Frontend can request specific sequences later
         sequence = sequence_result['sequences'][0]['sequence']
+        all_sequences = sequence_result['sequences'] if len(sequence_result['sequences']) > 1 else None
+        
+        # The response is addressed by the normalized input, so a client
+        # repeating a request can be answered without analyzing anything
+        etag = _etag(system, query, sequence_result['sequences'])
+        not_modified = _not_modified(etag)
+        if not_modified is not None:
+            return not_modified
         
-        # Analyzing sequence
+        # Long analyses run in the background; the client polls the job
+        if _run_async(sequence, system):
+            job_id = job_manager.submit(sequence, system, sequence_result['sequences'][0])
+            return _job_accepted(job_id, all_sequences=all_sequences)
+        
+        # Analyzing sequence; only the requested page of guides is sent
         results = guide_rna_analyzer.analyze_sequence(sequence, system)
+        with stage('paginate', system):
+            results = _paginate(results, guide_rna_analyzer.cache.make_key(sequence, system), query)
         
         # Adding sequence metadata to results
         results['sequence_info'] = sequence_result['sequences'][0]
         
-        return jsonify({
-            'success': True,
-            'data': results,
-            'all_sequences': sequence_result['sequences'] if len(sequence_result['sequences']) > 1 else None
-        })
+        with stage('serialize', system):
+            return _tagged(jsonify({
+                'success': True,
+                'data': results,
+                'all_sequences': all_sequences
+            }), etag)
         
     except Exception as e:
+        return _server_error(e)
+
+@bp.route('/guides', methods=['GET'])
+def get_guides_page():
+    """Next page of guides for a cursor returned by an analysis."""
+    cursor = decode_cursor(request.args.get('cursor', ''))
+    # The client holds the cursor, so its query is checked like a query string
+    cursor['query'] = _guide_query(cursor['query'])
+    etag = _etag(cursor)
+    not_modified = _not_modified(etag)
+    if not_modified is not None:
+        return not_modified
+    
+    # Pages after the first may reach a different worker than the analysis
+    results = guide_rna_analyzer.cache.get(cursor['key'])
+    if results is None:
+        results = result_store.get(_store_key(cursor['key']))
+        if results is not None:
+            # Serve this worker's next pages from memory
+            results = guide_rna_analyzer.cache.put(cursor['key'], results)
+    if results is None:
+        return jsonify({
+            'error': 'These results have expired, please run the analysis again'
+        }), 410
+    
+    page = paginate(results, cursor['key'], cursor['query'], cursor['offset'])
+    return _tagged(jsonify({
+        'success': True,
+        'guides': page['guides'],
+        'page': page['page']
+    }), etag)
+
+@bp.route('/guides/<guide>/structure', methods=['GET'])
+def get_guide_structure(guide):
+    """Fold and score one guide on demand (guides skipped by the prefilter)."""
+    guide = guide.upper()
+    system = request.args.get('system', 'SpCas9')
+
+    if not 1 <= len(guide) <= 100 or set(guide) - sequence_handler.valid_bases:
+        return jsonify({
+            'error': 'Guide must be 1-100 bases of A, C, G, T or N'
+        }), 400
+
+    etag = _etag(guide, system)
+    not_modified = _not_modified(etag)
+    if not_modified is not None:
+        return not_modified
+
+    try:
+        score = guide_rna_analyzer.score_guide(guide, system)
+    except ValueError as e:
         return jsonify({
             'error': str(e)
-        }), 500
+        }), 400
+
+    return _tagged(jsonify({
+        'success': True,
+        'data': score
+    }), etag)
 
-@app.route('/systems', methods=['GET'])
+@bp.route('/systems', methods=['GET'])
 def get_systems():
     """Get available CRISPR systems."""
-    return jsonify({
-        'systems': guide_rna_analyzer.crispr_systems
-    })
+    # Serialized and compressed once, when the services were built
+    services = _services()
+    not_modified = _not_modified(services.systems_etag)
+    if not_modified is not None:
+        return not_modified
+    
+    encoding = choose_encoding(request.accept_encodings)
+    response = Response(services.systems_encoded.get(encoding, services.systems_body),
+                        mimetype='application/json')
+    if encoding is not None:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    return _tagged(response, services.systems_etag)
 
-@app.route('/analyze_sequence', methods=['POST'])
+@bp.route('/analyze_sequence', methods=['POST'])
 def analyze_specific_sequence():
     """Analyze a specific sequence from FASTA input."""
+    query = _guide_query()
     try:
         data = request.get_json()
         sequence = data.get('sequence', '').strip()
@@ -61,15 +294,346 @@ def analyze_specific_sequence():
             return jsonify({
                 'error': 'No sequence provided'
             }), 400
+        
+        etag = _etag(sequence, system, query)
+        not_modified = _not_modified(etag)
+        if not_modified is not None:
+            return not_modified
+        
+        if _run_async(sequence, system):
+            return _job_accepted(job_manager.submit(sequence, system))
             
         results = guide_rna_analyzer.analyze_sequence(sequence, system)
+        with stage('paginate', system):
+            results = _paginate(results, guide_rna_analyzer.cache.make_key(sequence, system), query)
+        
+        with stage('serialize', system):
+            return _tagged(jsonify({
+                'success': True,
+                'data': results
+            }), etag)
+        
+    except Exception as e:
+        return _server_error(e)
+
+@bp.route('/compare', methods=['POST'])
+def compare_systems():
+    """Analyze one sequence for several CRISPR systems in a single pass."""
+    query = _guide_query()
+    try:
+        data = request.get_json()
+        sequence_input = data.get('sequence', '').strip()
+        systems = data.get('systems')
+
+        if systems is not None:
+            if (not isinstance(systems, list) or not systems
+                    or not all(isinstance(system, str) for system in systems)):
+                return jsonify({
+                    'error': 'systems must be a non-empty list of system names'
+                }), 400
+            unknown = [system for system in systems if system not in guide_rna_analyzer.crispr_systems]
+            if unknown:
+                return jsonify({
+                    'error': f"Unsupported CRISPR system: {', '.join(unknown)}"
+                }), 400
+
+        sequence_result = sequence_handler.process_input(sequence_input)
+        if not sequence_result['valid']:
+            return jsonify({
+                'error': sequence_result['error']
+            }), 400
+
+        etag = _etag(systems, query, sequence_result['sequences'][0])
+        not_modified = _not_modified(etag)
+        if not_modified is not None:
+            return not_modified
+
+        sequence = sequence_result['sequences'][0]['sequence']
+        try:
+            comparison = guide_rna_analyzer.compare_systems(sequence, systems)
+        except ValueError as e:
+            return jsonify({
+                'error': str(e)
+            }), 400
+
+        # Each system is paginated like a single-system analysis
+        results = {}
+        with stage('paginate', 'multi'):
+            for system, system_results in comparison['results'].items():
+                results[system] = _paginate(system_results,
+                                           guide_rna_analyzer.cache.make_key(sequence, system), query)
+
+        merged = comparison['merged']
+        with stage('serialize', 'multi'):
+            return _tagged(jsonify({
+                'success': True,
+                'data': {
+                    'results': results,
+                    'merged': {
+                        'total': len(merged),
+                        'sites': merged[:query['limit']]
+                    },
+                    'metadata': comparison['metadata'],
+                    'sequence_info': sequence_result['sequences'][0]
+                }
+            }), etag)
+
+    except Exception as e:
+        return _server_error(e)
+
+@bp.route('/batch', methods=['POST'])
+def analyze_batch():
+    """
+    Analyze many records for one or more systems in one request. Takes
+    'records' (sequences or {'id', 'sequence'} objects) or FASTA text in
+    'sequence', and 'systems' (default: 'system', or SpCas9). A record that
+    is invalid or fails gets an error entry instead of failing the batch.
+    Batches of ASYNC_THRESHOLD distinct bases or more are run as a job
+    (202; the job result has the same shape as this response).
+    """
+    query = _guide_query()
+    try:
+        data = request.get_json()
+        systems = data.get('systems') or [data.get('system', 'SpCas9')]
+        records = data.get('records')
+
+        if not isinstance(systems, list) or not all(isinstance(system, str) for system in systems):
+            return jsonify({
+                'error': 'systems must be a non-empty list of system names'
+            }), 400
+        unknown = [system for system in systems if system not in guide_rna_analyzer.crispr_systems]
+        if unknown:
+            return jsonify({
+                'error': f"Unsupported CRISPR system: {', '.join(unknown)}"
+            }), 400
+
+        try:
+            if records is not None:
+                if not isinstance(records, list):
+                    raise ValueError('records must be a list')
+                entries = list(sequence_handler.iter_batch_records(records))
+            else:
+                entries = sequence_handler.process_records(data.get('sequence', ''))
+        except ValueError as e:
+            return jsonify({
+                'error': str(e)
+            }), 400
+
+        max_records = _config().MAX_BATCH_RECORDS
+        if not entries or len(entries) > max_records:
+            return jsonify({
+                'error': f'A batch takes 1 to {max_records} records'
+            }), 400
+
+        etag = _etag(systems, query, entries)
+        not_modified = _not_modified(etag)
+        if not_modified is not None:
+            return not_modified
+
+        # Batches as long as a large single analysis run in the background
+        sequences = {entry['sequence']['sequence'] for entry in entries if entry['valid']}
+        if sum(map(len, sequences)) >= _config().ASYNC_THRESHOLD:
+            return _job_accepted(job_manager.submit_batch(entries, systems))
+
+        outcomes = batch_runner.run(entries, systems)
+        body = _batch_response(outcomes, systems, query)
+        with stage('serialize', 'batch'):
+            return _tagged(jsonify(body), etag)
+
+    except Exception as e:
+        return _server_error(e)
+
+def _batch_response(outcomes, systems, query):
+    """/batch response body for BatchRunner outcomes, each system's guides paged."""
+    with stage('paginate', 'batch'):
+        for outcome in outcomes:
+            if 'results' in outcome:
+                sequence = outcome.pop('sequence')
+                outcome['success'] = True
+                outcome['results'] = {
+                    system: _paginate(results, guide_rna_analyzer.cache.make_key(sequence, system), query)
+                    for system, results in outcome['results'].items()
+                }
+
+    return {
+        'success': True,
+        'records': outcomes,
+        'summary': {
+            'records': len(outcomes),
+            'errors': sum('error' in outcome for outcome in outcomes),
+            'duplicates': sum(bool(outcome.get('duplicate_of')) for outcome in outcomes),
+            'systems': systems
+        }
+    }
+
+def _allowed_file(filename: str) -> bool:
+    """Check the upload's extension against Config.ALLOWED_EXTENSIONS."""
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in _config().ALLOWED_EXTENSIONS
+
+def _ndjson(payload) -> str:
+    return current_app.json.dumps(payload) + '\n'
+
+@bp.route('/upload', methods=['POST'])
+def upload_fasta():
+    """
+    Analyze every record of an uploaded FASTA file, streaming one JSON line
+    per record. Accepts a multipart 'file' field, or the FASTA itself as the
+    request body (read incrementally as it arrives).
+    """
+    if request.mimetype == 'multipart/form-data':
+        upload = request.files.get('file')
+        if upload is None or not upload.filename:
+            return jsonify({
+                'error': 'No file provided'
+            }), 400
+        if not _allowed_file(upload.filename):
+            return jsonify({
+                'error': f"Unsupported file type, expected one of: {', '.join(sorted(_config().ALLOWED_EXTENSIONS))}"
+            }), 400
+        system = request.form.get('system', request.args.get('system', 'SpCas9'))
+        # Take ownership of the spooled file: the request closes its files
+        # when the view returns, before the response body is generated
+        stream, upload.stream = upload.stream, io.BytesIO()
+    else:
+        system = request.args.get('system', 'SpCas9')
+        stream = io.BufferedReader(request.stream)
+    
+    if system not in guide_rna_analyzer.crispr_systems:
+        return jsonify({
+            'error': f"Unsupported CRISPR system: {system}"
+        }), 400
+    
+    query = _guide_query()
+    fasta_handle = io.TextIOWrapper(stream, encoding='utf-8', errors='replace')
+    
+    def generate():
+        records = 0
+        errors = 0
+        try:
+            for entry in sequence_handler.iter_fasta_records(fasta_handle):
+                records += 1
+                if not entry['valid']:
+                    errors += 1
+                    yield _ndjson({'id': entry['id'], 'error': entry['error']})
+                    continue
+                
+                sequence_info = dict(entry['sequence'])
+                sequence = sequence_info.pop('sequence')
+                try:
+                    results = guide_rna_analyzer.analyze_sequence(sequence, system)
+                    results = _paginate(results, guide_rna_analyzer.cache.make_key(sequence, system), query)
+                except Exception as e:
+                    current_app.logger.exception('Analysis of FASTA record %s failed', sequence_info['id'])
+                    errors += 1
+                    yield _ndjson({'id': sequence_info['id'], 'error': str(e)})
+                    continue
+                results['sequence_info'] = sequence_info
+                yield _ndjson({'id': sequence_info['id'], 'success': True, 'data': results})
+        except Exception as e:
+            current_app.logger.exception('FASTA upload failed')
+            yield _ndjson({'error': f'Error parsing FASTA format: {str(e)}'})
+            return
+        finally:
+            fasta_handle.close()
+        
+        yield _ndjson({'done': True, 'records': records, 'errors': errors})
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@bp.route('/jobs', methods=['POST'])
+def submit_job():
+    """Submit an analysis to run in the background."""
+    try:
+        data = request.get_json()
+        sequence_input = data.get('sequence', '').strip()
+        system = data.get('system', 'SpCas9')
+        
+        if system not in guide_rna_analyzer.crispr_systems:
+            return jsonify({
+                'error': f"Unsupported CRISPR system: {system}"
+            }), 400
+        
+        sequence_result = sequence_handler.process_input(sequence_input)
+        if not sequence_result['valid']:
+            return jsonify({
+                'error': sequence_result['error']
+            }), 400
+        
+        sequence_info = sequence_result['sequences'][0]
+        job_id = job_manager.submit(sequence_info['sequence'], system, sequence_info)
+        return _job_accepted(job_id)
+        
+    except Exception as e:
+        return _server_error(e)
+
+@bp.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """Job status and progress (guides folded / total)."""
+    job = job_manager.store.get(job_id)
+    if job is None:
+        return jsonify({
+            'error': 'Unknown job'
+        }), 404
+    return jsonify(job)
+
+@bp.route('/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    """Result of a finished job; 202 while it is still running."""
+    job = job_manager.store.get(job_id)
+    if job is None:
+        return jsonify({
+            'error': 'Unknown job'
+        }), 404
+    
+    if job['status'] == DONE:
+        query = _guide_query()
+        stored = job_manager.store.get_result(job_id)
+        if stored['result_key'] is None:
+            # A batch job (see JobManager.submit_batch)
+            batch = json.loads(stored['result'])
+            return jsonify(_batch_response(batch['records'], batch['systems'], query))
         
+        results = guide_rna_analyzer.cache.get(stored['result_key'])
+        if results is None:
+            # Analysis ran in another worker (or expired here): page the
+            # stored result instead
+            results = ResultStore.load(stored['result'])
+            # Kept out of the shared result; added back below
+            results.pop('sequence_info', None)
+        results = _paginate(results, stored['result_key'], query)
+        if stored['sequence_info'] is not None:
+            results['sequence_info'] = stored['sequence_info']
         return jsonify({
             'success': True,
             'data': results
         })
-        
-    except Exception as e:
+    
+    if job['status'] in FINISHED_STATES:
         return jsonify({
-            'error': str(e)
-        }), 500
\ No newline at end of file
+            'error': job['error'] or f"Job {job['status']}",
+            'status': job['status']
+        }), 409
+    
+    return jsonify(job), 202
+
+@bp.route('/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """Cancel a pending or running job."""
+    job = job_manager.store.get(job_id)
+    if job is None:
+        return jsonify({
+            'error': 'Unknown job'
+        }), 404
+    
+    if not job_manager.store.request_cancel(job_id):
+        return jsonify({
+            'error': f"Job already {job['status']}",
+            'status': job['status']
+        }), 409
+    
+    return jsonify(job_manager.store.get(job_id))
+
+@bp.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus metrics for this worker process."""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
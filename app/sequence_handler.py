@@ -1,13 +1,23 @@
-from typing import List, Dict, Union, Optional
-from Bio import SeqIO
-from Bio.Seq import Seq
+from typing import List, Dict, Union, Optional, Iterator, TextIO
 from io import StringIO
+from collections import OrderedDict
+import hashlib
+from app.off_target import SeedIndex, OffTargetSite
+from app.genome_index import GenomeIndex, GenomeSite
+from app.metrics import stage
 
 class SequenceHandler:
     def __init__(self):
         self.valid_bases = set(['A', 'T', 'G', 'C', 'N'])
         self.complementary_bases = {'A': 'T', 'T': 'A', 'G': 'C', 'C': 'G', 'N': 'N'}
         self.max_off_target_score = 4
+        self.max_off_target_mismatches = 3
+        self.off_target_seed_length = 5
+        # Seed indexes for recently searched sequences, keyed by digest
+        self.off_target_indexes = OrderedDict()
+        self.max_cached_indexes = 4
+        # Optional memory-mapped reference genome for genome-wide off-targets
+        self.genome_index = None
         self.min_sequence_length = 20
         self.max_sequence_length = 200000  # 200kb
 
@@ -16,13 +26,14 @@ class SequenceHandler:
         Process input sequence, handling both FASTA and plain sequence formats.
         Returns validation results and processed sequences.
         """
-        sequence_input = sequence_input.strip()
-        
-        # Check if input is in FASTA format
-        if sequence_input.startswith('>'):
-            return self.process_fasta(sequence_input)
-        else:
-            return self.process_plain_sequence(sequence_input)
+        with stage('parse'):
+            sequence_input = sequence_input.strip()
+            
+            # Check if input is in FASTA format
+            if sequence_input.startswith('>'):
+                return self.process_fasta(sequence_input)
+            else:
+                return self.process_plain_sequence(sequence_input)
 
     def process_fasta(self, fasta_input: str) -> Dict[str, Union[bool, str, List[Dict]]]:
         """
@@ -33,25 +44,13 @@ class SequenceHandler:
             fasta_handle = StringIO(fasta_input)
             sequences = []
             
-            # Parsing FASTA using BioPython
-            for record in SeqIO.parse(fasta_handle, "fasta"):
-                sequence = str(record.seq).upper()
-                
-                # Validate sequence
-                validation_result = self.validate_sequence(sequence)
-                if not validation_result['valid']:
+            for entry in self.iter_fasta_records(fasta_handle):
+                if not entry['valid']:
                     return {
                         'valid': False,
-                        'error': f"Invalid sequence in FASTA entry '{record.id}': {validation_result['error']}"
+                        'error': entry['error']
                     }
-                
-                sequences.append({
-                    'id': record.id,
-                    'description': record.description,
-                    'sequence': sequence,
-                    'length': len(sequence),
-                    'gc_content': self.calculate_gc_content(sequence)
-                })
+                sequences.append(entry['sequence'])
             
             if not sequences:
                 return {
@@ -71,6 +70,99 @@ class SequenceHandler:
                 'error': f'Error parsing FASTA format: {str(e)}'
             }
 
+    def iter_fasta_records(self, fasta_handle: TextIO) -> Iterator[Dict[str, Union[bool, str, Dict]]]:
+        """
+        Parse and validate FASTA records one at a time from a text handle,
+        so large uploads never have to be held as one string. Yields
+        {'valid': True, 'sequence': {...}} or {'valid': False, 'id', 'error'}.
+        """
+        # Parsing FASTA using BioPython (imported here, it's slow to import)
+        from Bio import SeqIO
+        for record in SeqIO.parse(fasta_handle, "fasta"):
+            sequence = str(record.seq).upper()
+            
+            # Validate sequence
+            validation_result = self.validate_sequence(sequence)
+            if not validation_result['valid']:
+                yield {
+                    'valid': False,
+                    'id': record.id,
+                    'error': f"Invalid sequence in FASTA entry '{record.id}': {validation_result['error']}"
+                }
+                continue
+            
+            yield {
+                'valid': True,
+                'sequence': {
+                    'id': record.id,
+                    'description': record.description,
+                    'sequence': sequence,
+                    'length': len(sequence),
+                    'gc_content': self.calculate_gc_content(sequence)
+                }
+            }
+
+    def process_records(self, sequence_input: str) -> List[Dict[str, Union[bool, str, Dict]]]:
+        """
+        Like process_input, but returns one entry per record (shaped as in
+        iter_fasta_records) so one bad record doesn't reject the rest.
+        """
+        with stage('parse'):
+            sequence_input = sequence_input.strip()
+            if sequence_input.startswith('>'):
+                try:
+                    return list(self.iter_fasta_records(StringIO(sequence_input)))
+                except Exception as e:
+                    raise ValueError(f'Error parsing FASTA format: {str(e)}')
+            result = self.process_plain_sequence(sequence_input)
+            if not result['valid']:
+                return [{'valid': False, 'id': 'input_sequence', 'error': result['error']}]
+            return [{'valid': True, 'sequence': result['sequences'][0]}]
+
+    def iter_batch_records(self, records: List[Union[str, Dict]]) -> Iterator[Dict[str, Union[bool, str, Dict]]]:
+        """
+        Validate a list of records, each a sequence string or an object with
+        'sequence' and optional 'id'/'description'. Yields entries shaped
+        like iter_fasta_records.
+        """
+        for number, record in enumerate(records, 1):
+            record_id = f'record_{number}'
+            if isinstance(record, dict):
+                record_id = str(record.get('id') or record_id)
+                sequence = record.get('sequence')
+                description = str(record.get('description') or record_id)
+            else:
+                sequence, description = record, record_id
+
+            if not isinstance(sequence, str):
+                yield {
+                    'valid': False,
+                    'id': record_id,
+                    'error': f"Record '{record_id}' has no sequence"
+                }
+                continue
+
+            sequence = self.clean_sequence(sequence)
+            validation_result = self.validate_sequence(sequence)
+            if not validation_result['valid']:
+                yield {
+                    'valid': False,
+                    'id': record_id,
+                    'error': f"Invalid sequence in record '{record_id}': {validation_result['error']}"
+                }
+                continue
+
+            yield {
+                'valid': True,
+                'sequence': {
+                    'id': record_id,
+                    'description': description,
+                    'sequence': sequence,
+                    'length': len(sequence),
+                    'gc_content': self.calculate_gc_content(sequence)
+                }
+            }
+
     def process_plain_sequence(self, sequence: str) -> Dict[str, Union[bool, str, Dict]]:
         """
         Process plain sequence input.
@@ -134,24 +226,41 @@ class SequenceHandler:
         gc_count = sequence.count('G') + sequence.count('C')
         return (gc_count / len(sequence)) * 100 if sequence else 0
     
+    def get_off_target_index(self, sequence: str) -> SeedIndex:
+        """Return the seed index for sequence, building it once."""
+        key = hashlib.sha256(sequence.encode()).hexdigest()
+        index = self.off_target_indexes.get(key)
+        if index is None:
+            index = SeedIndex(sequence, self.off_target_seed_length)
+            self.off_target_indexes[key] = index
+            if len(self.off_target_indexes) > self.max_cached_indexes:
+                self.off_target_indexes.popitem(last=False)
+        else:
+            self.off_target_indexes.move_to_end(key)
+        return index
+    
+    def search_off_targets(self, guide_sequences: List[str], sequence: str) -> Dict[str, List[OffTargetSite]]:
+        """Find off-target sites (position, strand, mismatches) for a batch of guides."""
+        index = self.get_off_target_index(sequence)
+        return index.search_many(guide_sequences, self.max_off_target_mismatches)
+    
+    def load_genome_index(self, path: str) -> GenomeIndex:
+        """Attach a reference genome index built with `flask build-genome-index`."""
+        self.genome_index = GenomeIndex(path)
+        return self.genome_index
+    
+    def find_genome_off_target_sites(self, guide_sequence: str) -> List[GenomeSite]:
+        """Find off-target sites for a guide across the attached reference genome."""
+        if self.genome_index is None:
+            raise ValueError('No genome index loaded')
+        max_mismatches = min(self.max_off_target_mismatches,
+                             self.genome_index.max_mismatches_for(len(guide_sequence)))
+        return self.genome_index.search(guide_sequence, max_mismatches)
+    
     def find_off_target_sites(self, guide_sequence: str, sequence: str) -> List[str]:
         """Find potential off-target sites."""
-        off_target_sites = []
-        
-        # Search forward strand
-        for i in range(len(sequence) - len(guide_sequence) + 1):
-            site = sequence[i:i+len(guide_sequence)]
-            if self.count_mismatches(guide_sequence, site) <= 3:
-                off_target_sites.append(site)
-        
-        # Search reverse strand
-        reverse_sequence = self.get_reverse_complement(sequence)
-        for i in range(len(reverse_sequence) - len(guide_sequence) + 1):
-            site = reverse_sequence[i:i+len(guide_sequence)]
-            if self.count_mismatches(guide_sequence, site) <= 3 and site != guide_sequence:
-                off_target_sites.append(site)
-        
-        return off_target_sites
+        index = self.get_off_target_index(sequence)
+        return [site.sequence for site in index.search(guide_sequence, self.max_off_target_mismatches)]
     
     def count_mismatches(self, sequence1: str, sequence2: str) -> int:
         """Count mismatches between two sequences."""
@@ -176,7 +285,14 @@ class SequenceHandler:
         return matches / len(sequence)
     
     def calculate_off_target_score(self, guide_sequence: str, sequence: str) -> float:
-        """Calculate off-target score."""
-        off_target_sites = self.find_off_target_sites(guide_sequence, sequence)
-        return sum(1 - (20 - self.count_mismatches(guide_sequence, site)) / 20 
+        """
+        Calculate off-target score. Uses the reference genome when an index
+        is loaded, otherwise searches within the given sequence.
+        """
+        if self.genome_index is not None:
+            off_target_sites = self.find_genome_off_target_sites(guide_sequence)
+        else:
+            index = self.get_off_target_index(sequence)
+            off_target_sites = index.search(guide_sequence, self.max_off_target_mismatches)
+        return sum(1 - (20 - site.mismatches) / 20 
                   for site in off_target_sites)
\ No newline at end of file
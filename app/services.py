@@ -0,0 +1,104 @@
+import hashlib
+import json
+from threading import Lock
+from typing import Dict, Type
+
+from app.batch import BatchRunner
+from app.compression import ENCODINGS, compress
+from app.guide_rna_analyzer import GuideRNAAnalyzer
+from app.jobs import JobManager, JobStore
+from app.metrics import REGISTRY, CACHE_HITS, CACHE_MISSES, Gauge
+from app.result_store import ResultStore
+from app.sequence_handler import SequenceHandler
+
+# One set of services per config class and process, shared by every app
+# built from it
+_services: Dict[type, 'Services'] = {}
+_services_lock = Lock()
+_gauges_registered = False
+
+
+class Services:
+    """
+    The analysis services behind the web app: sequence handler, analyzer,
+    job manager, batch runner and shared result store, plus the static
+    /systems response.
+
+    Building them is cheap: pools and threads start on first use, and
+    ViennaRNA and Biopython are imported on first use. `warm()` does that
+    first-use work up front.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.sequence_handler = SequenceHandler()
+        # Compiles the PAM scanners of every system
+        self.analyzer = GuideRNAAnalyzer(config)
+        self.batch_runner = BatchRunner(self.analyzer, config, workers=config.BATCH_WORKERS)
+        self.job_manager = JobManager(
+            self.analyzer,
+            JobStore(config.JOB_STORE_PATH),
+            workers=config.JOB_WORKERS,
+            retention=config.JOB_RETENTION,
+            batch_runner=self.batch_runner
+        )
+        self.result_store = ResultStore(config.RESULT_STORE_PATH, ttl=config.CACHE_TIMEOUT)
+
+        # The systems table never changes while the app runs: serialize (and
+        # compress) its response once
+        self.systems_body = (json.dumps({'systems': self.analyzer.crispr_systems},
+                                        sort_keys=True) + '\n').encode()
+        self.systems_etag = hashlib.sha256(self.systems_body).hexdigest()[:32]
+        self.systems_encoded = {
+            encoding: compress(self.systems_body, encoding, config.GZIP_LEVEL, config.BROTLI_QUALITY)
+            for encoding in ENCODINGS
+        }
+
+        # Genome-wide off-target search, if a reference index has been built
+        if config.GENOME_INDEX_PATH:
+            self.sequence_handler.load_genome_index(config.GENOME_INDEX_PATH)
+
+    def warm(self) -> None:
+        """Do the first-use work now: heavy imports and the settings fingerprint."""
+        from Bio import SeqIO  # noqa: F401
+        from app.folding import load_rna
+        load_rna()
+        self.analyzer.fingerprint
+
+    def register_gauges(self) -> None:
+        """Cache gauges for /metrics (the registry is per process, so only once)."""
+        global _gauges_registered
+        if _gauges_registered:
+            return
+        _gauges_registered = True
+        analyzer = self.analyzer
+
+        # Cache effectiveness per system, from the lookup counters at scrape time
+        def cache_hit_ratios():
+            hits = CACHE_HITS.values()
+            misses = CACHE_MISSES.values()
+            ratios = []
+            for key in sorted(hits.keys() | misses.keys()):
+                lookups = hits.get(key, 0) + misses.get(key, 0)
+                ratios.append((key, round(hits.get(key, 0) / lookups, 4)))
+            return ratios
+
+        REGISTRY.register(Gauge(
+            'crispradium_cache_hit_ratio', 'Hit ratio of the in-process caches and the fold store.',
+            ('cache', 'system'), cache_hit_ratios
+        ))
+        REGISTRY.register(Gauge(
+            'crispradium_cache_entries', 'Entries held in the in-process caches.', ('cache',),
+            lambda: [(('result',), analyzer.cache.stats()['entries']),
+                     (('fold',), analyzer.fold_cache.stats()['entries'])]
+        ))
+
+
+def get_services(config: Type) -> Services:
+    """This process's services for a config class, built on first call."""
+    with _services_lock:
+        services = _services.get(config)
+        if services is None:
+            services = _services[config] = Services(config)
+            services.register_gauges()
+        return services
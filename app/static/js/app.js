@@ -3,6 +3,8 @@ let guideChart = null;
 let currentResults = null;
 let currentChartType = 'scatter';
 let currentData = null
+let nextGuideCursor = null;
+let loadedGuides = 0;
 
 // FASTA handling utils
 const FASTA_UTILS = {
@@ -177,7 +179,12 @@ form.addEventListener('submit', async (e) => {
             body: JSON.stringify({ sequence, system }),
         });
         
-        const result = await response.json();
+        let result = await response.json();
+        
+        // Large inputs are analyzed in the background
+        if (response.status === 202 && result.job_id) {
+            result = await waitForJob(result, submitBtn);
+        }
         
         if (result.error) {
             showError(result.error);
@@ -195,6 +202,20 @@ form.addEventListener('submit', async (e) => {
     }
 });
 
+// Poll a background analysis job until it finishes
+async function waitForJob(job, statusButton) {
+    while (true) {
+        await new Promise(resolve => setTimeout(resolve, 1000));
+        const response = await fetch(job.result_url);
+        const result = await response.json();
+        
+        if (response.status !== 202) {
+            return result;
+        }
+        statusButton.textContent = `Analyzing... ${result.progress.percent}%`;
+    }
+}
+
 // Handle sequence input
 document.getElementById('sequence').addEventListener('input', function(e) {
     const input = e.target.value.trim();
@@ -215,19 +236,42 @@ document.getElementById('sequence').addEventListener('input', function(e) {
     }
 });
 
-// Download results
-downloadBtn.addEventListener('click', () => {
+// Download results - every guide, not just the pages shown so far
+downloadBtn.addEventListener('click', async () => {
     if (!currentResults) return;
+    downloadBtn.disabled = true;
     
-    const blob = new Blob([JSON.stringify(currentResults, null, 2)], { type: 'application/json' });
-    const url = URL.createObjectURL(blob);
-    const a = document.createElement('a');
-    a.href = url;
-    a.download = 'crispr_analysis_results.json';
-    document.body.appendChild(a);
-    a.click();
-    document.body.removeChild(a);
-    URL.revokeObjectURL(url);
+    try {
+        const guides = [...currentResults.guides];
+        let cursor = currentResults.page ? currentResults.page.next_cursor : null;
+        while (cursor) {
+            const response = await fetch(`/guides?cursor=${encodeURIComponent(cursor)}`);
+            const result = await response.json();
+            
+            if (result.error) {
+                showError(result.error);
+                return;
+            }
+            guides.push(...result.guides);
+            cursor = result.page.next_cursor;
+        }
+        
+        // The page block only described the first page
+        const { page, ...results } = currentResults;
+        const blob = new Blob([JSON.stringify({ ...results, guides }, null, 2)], { type: 'application/json' });
+        const url = URL.createObjectURL(blob);
+        const a = document.createElement('a');
+        a.href = url;
+        a.download = 'crispr_analysis_results.json';
+        document.body.appendChild(a);
+        a.click();
+        document.body.removeChild(a);
+        URL.revokeObjectURL(url);
+    } catch (error) {
+        showError('Failed to download results');
+    } finally {
+        downloadBtn.disabled = false;
+    }
 });
 
 // Display results
@@ -247,26 +291,98 @@ function displayResults(data) {
         </div>
         <div class="p-4 bg-gray-50 rounded-lg">
             <h3 class="font-semibold text-gray-700">Average Efficiency</h3>
-            <p class="text-2xl font-bold text-gray-900">${stats.average_efficiency}</p>
+            <p class="text-2xl font-bold text-gray-900">${stats.average_efficiency ?? '—'}</p>
         </div>
     `;
     
     // Update chart
     updateChart(data.visualization_data);
     
-    // Display guide list
-    const guideList = document.getElementById('guideList');
-    guideList.innerHTML = data.guides.map(guide => `
+    // Display the first page of guides; more are fetched on demand
+    document.getElementById('guideList').innerHTML = renderGuideRows(data.guides);
+    loadedGuides = data.guides.length;
+    updatePager(data.page);
+}
+
+// Build table rows for a page of guides
+function renderGuideRows(guides) {
+    return guides.map(guide => `
         <tr>
             <td class="px-6 py-4 whitespace-nowrap text-sm font-medium text-gray-900">${guide.sequence}</td>
             <td class="px-6 py-4 whitespace-nowrap text-sm text-gray-500">${guide.position}</td>
+            <td class="px-6 py-4 whitespace-nowrap text-sm text-gray-500">${guide.strand}</td>
             <td class="px-6 py-4 whitespace-nowrap text-sm text-gray-500">${guide.pam}</td>
             <td class="px-6 py-4 whitespace-nowrap text-sm text-gray-500">${guide.gc_content.toFixed(1)}%</td>
-            <td class="px-6 py-4 whitespace-nowrap text-sm text-gray-500">${guide.efficiency_score}</td>
+            <td class="px-6 py-4 whitespace-nowrap text-sm text-gray-500">${renderEfficiency(guide)}</td>
         </tr>
     `).join('');
 }
 
+// Guides skipped by the fold prefilter have no score until folded on demand
+function renderEfficiency(guide) {
+    if (guide.efficiency_score !== null) return guide.efficiency_score;
+    return `<button class="fold-guide text-gray-900 underline" data-guide="${guide.sequence}">Fold</button>`;
+}
+
+// Fold a prefiltered guide and fill in its efficiency score
+document.getElementById('guideList').addEventListener('click', async (e) => {
+    const button = e.target.closest('.fold-guide');
+    if (!button) return;
+    button.disabled = true;
+    
+    try {
+        const system = document.getElementById('system').value;
+        const response = await fetch(`/guides/${button.dataset.guide}/structure?system=${encodeURIComponent(system)}`);
+        const result = await response.json();
+        
+        if (result.error) {
+            showError(result.error);
+            button.disabled = false;
+            return;
+        }
+        button.replaceWith(document.createTextNode(result.data.efficiency_score));
+    } catch (error) {
+        showError('Failed to fold guide');
+        button.disabled = false;
+    }
+});
+
+// Show how many guides are loaded and whether there are more
+function updatePager(page) {
+    const pager = document.getElementById('guidePager');
+    if (!page) {
+        pager.classList.add('hidden');
+        return;
+    }
+    nextGuideCursor = page.next_cursor;
+    document.getElementById('guideCount').textContent = `Showing ${loadedGuides} of ${page.total} guides`;
+    document.getElementById('loadMoreBtn').classList.toggle('hidden', !nextGuideCursor);
+    pager.classList.remove('hidden');
+}
+
+// Load the next page of guides
+document.getElementById('loadMoreBtn').addEventListener('click', async (e) => {
+    if (!nextGuideCursor) return;
+    e.target.disabled = true;
+    
+    try {
+        const response = await fetch(`/guides?cursor=${encodeURIComponent(nextGuideCursor)}`);
+        const result = await response.json();
+        
+        if (result.error) {
+            showError(result.error);
+            return;
+        }
+        document.getElementById('guideList').insertAdjacentHTML('beforeend', renderGuideRows(result.guides));
+        loadedGuides += result.guides.length;
+        updatePager(result.page);
+    } catch (error) {
+        showError('Failed to load more guides');
+    } finally {
+        e.target.disabled = false;
+    }
+});
+
 // Update chart
 function updateChart(visualizationData) {
     const ctx = document.getElementById('guideChart').getContext('2d');
@@ -279,11 +395,15 @@ function updateChart(visualizationData) {
         type: 'scatter',
         data: {
             datasets: [{
-                label: 'Guide Efficiency vs Position',
+                // Large sets only send the best guide of each position bin
+                label: visualizationData.bin_size
+                    ? `Best Guide Efficiency per ${visualizationData.bin_size} bp`
+                    : 'Guide Efficiency vs Position',
+                // Unfolded guides have no score to plot
                 data: visualizationData.positions.map((pos, i) => ({
                     x: pos,
                     y: visualizationData.scores[i]
-                })),
+                })).filter(point => point.y !== null),
                 backgroundColor: 'rgba(17, 24, 39, 0.5)',  // gray-900 with transparency
                 borderColor: 'rgba(17, 24, 39, 1)'        // gray-900
             }]
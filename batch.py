@@ -0,0 +1,4 @@
+from app.batch_cli import main
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,385 @@
+"""
+Benchmarks for the analysis hot paths.
+
+Runs on seeded synthetic sequences, so every run sees the same input:
+
+- GuideRNAAnalyzer.analyze_sequence, for every CRISPR system and size
+- SequenceHandler.process_fasta, on multi-record FASTA
+- SequenceHandler.find_off_target_sites, for a batch of guides
+- POST /analyze end to end through the Flask test client
+- analyze_sequence in fast fold mode against full, with the score drift
+
+Each benchmark starts with cold caches. Results (wall time, guides/sec,
+fold calls, peak traced memory) are written as JSON and compared against
+a stored baseline.
+
+    python benchmarks/run.py                      # full run, compare to baseline.json
+    python benchmarks/run.py --quick              # 1kb and 10kb only
+    python benchmarks/run.py --save-baseline      # record a new baseline
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+
+from app.guide_rna_analyzer import GuideRNAAnalyzer
+from app.sequence_handler import SequenceHandler
+from config import get_config
+
+DEFAULT_SIZES = [1000, 10000, 50000, 200000]
+QUICK_SIZES = [1000, 10000]
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+FASTA_RECORD_LENGTH = 1000
+OFF_TARGET_GUIDES = 100
+JOB_TIMEOUT = 900  # seconds to wait for an async /analyze job
+
+
+def make_sequence(length: int, seed: int) -> str:
+    """Uniform random DNA, identical for the same length and seed."""
+    return ''.join(random.Random(f'{seed}:{length}').choices('ACGT', k=length))
+
+
+def make_fasta(length: int, seed: int) -> str:
+    """FASTA of FASTA_RECORD_LENGTH-base records totalling about `length` bases."""
+    sequence = make_sequence(length, seed)
+    lines = []
+    for i in range(0, len(sequence), FASTA_RECORD_LENGTH):
+        record = sequence[i:i + FASTA_RECORD_LENGTH]
+        if len(record) < 20:
+            break
+        lines.append(f'>record_{i // FASTA_RECORD_LENGTH} synthetic')
+        lines.extend(record[j:j + 80] for j in range(0, len(record), 80))
+    return '\n'.join(lines) + '\n'
+
+
+def measure(setup: Callable[[], Any], run: Callable[[Any], Dict[str, Any]],
+            repeats: int, memory: bool) -> Dict[str, Any]:
+    """
+    Best wall time over `repeats` runs, each on a fresh `setup()` state,
+    plus peak traced memory from one extra run (tracing slows code down,
+    so it is kept out of the timed runs).
+    """
+    timings = []
+    stats = {}
+    for _ in range(repeats):
+        state = setup()
+        start = time.perf_counter()
+        stats = run(state)
+        timings.append(time.perf_counter() - start)
+
+    result = {'wall_time': round(min(timings), 6), 'wall_times': [round(t, 6) for t in timings]}
+    result.update(stats)
+    if memory:
+        state = setup()
+        tracemalloc.start()
+        try:
+            run(state)
+            result['peak_memory_bytes'] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return result
+
+
+def _per_second(count: int, seconds: float) -> float:
+    return round(count / seconds, 2) if seconds > 0 else 0.0
+
+
+def bench_analyze_sequence(sizes: List[int], systems: List[str], seed: int,
+                           repeats: int, memory: bool) -> List[Dict[str, Any]]:
+    results = []
+    for size in sizes:
+        sequence = make_sequence(size, seed)
+        for system in systems:
+            def run(analyzer: GuideRNAAnalyzer) -> Dict[str, Any]:
+                analysis = analyzer.analyze_sequence(sequence, system)
+                return {
+                    'guides': len(analysis['guides']),
+                    'fold_calls': analyzer.fold_cache.stats()['misses']
+                }
+
+            result = measure(GuideRNAAnalyzer, run, repeats, memory)
+            result['guides_per_sec'] = _per_second(result['guides'], result['wall_time'])
+            results.append({'name': f'analyze_sequence[{system}:{size}]', 'benchmark': 'analyze_sequence',
+                            'system': system, 'size': size, **result})
+            _progress(results[-1])
+    return results
+
+
+def bench_process_fasta(sizes: List[int], seed: int, repeats: int, memory: bool) -> List[Dict[str, Any]]:
+    results = []
+    for size in sizes:
+        fasta = make_fasta(size, seed)
+
+        def run(handler: SequenceHandler) -> Dict[str, Any]:
+            processed = handler.process_fasta(fasta)
+            return {'records': len(processed['sequences'])}
+
+        result = measure(SequenceHandler, run, repeats, memory)
+        result['bases_per_sec'] = _per_second(size, result['wall_time'])
+        results.append({'name': f'process_fasta[{size}]', 'benchmark': 'process_fasta',
+                        'size': size, **result})
+        _progress(results[-1])
+    return results
+
+
+def bench_off_targets(sizes: List[int], seed: int, repeats: int, memory: bool) -> List[Dict[str, Any]]:
+    results = []
+    for size in sizes:
+        sequence = make_sequence(size, seed)
+        rng = random.Random(seed)
+        starts = [rng.randrange(0, size - 20) for _ in range(OFF_TARGET_GUIDES)]
+        guides = [sequence[start:start + 20] for start in starts]
+
+        def run(handler: SequenceHandler) -> Dict[str, Any]:
+            # Includes building the seed index, as the first request would
+            sites = sum(len(handler.find_off_target_sites(guide, sequence)) for guide in guides)
+            return {'guides': len(guides), 'sites': sites}
+
+        result = measure(SequenceHandler, run, repeats, memory)
+        result['guides_per_sec'] = _per_second(result['guides'], result['wall_time'])
+        results.append({'name': f'find_off_target_sites[{size}]', 'benchmark': 'find_off_target_sites',
+                        'size': size, **result})
+        _progress(results[-1])
+    return results
+
+
+def bench_analyze_endpoint(sizes: List[int], seed: int, repeats: int, memory: bool,
+                           system: str = 'SpCas9') -> List[Dict[str, Any]]:
+    """POST /analyze; inputs over ASYNC_THRESHOLD are followed through the job until done."""
+    from app import create_app
+
+    app = create_app()
+    guide_rna_analyzer = app.extensions['crispradium'].analyzer
+    client = app.test_client()
+    results = []
+    for size in sizes:
+        sequence = make_sequence(size, seed)
+
+        def setup():
+            guide_rna_analyzer.cache.clear()
+            guide_rna_analyzer.fold_cache.clear()
+            return client
+
+        def run(client) -> Dict[str, Any]:
+            response = client.post('/analyze', json={'sequence': sequence, 'system': system})
+            mode = 'sync'
+            if response.status_code == 202:
+                mode = 'async'
+                result_url = response.get_json()['result_url']
+                deadline = time.monotonic() + JOB_TIMEOUT
+                while response.status_code == 202:
+                    if time.monotonic() > deadline:
+                        raise RuntimeError(f'/analyze job did not finish within {JOB_TIMEOUT}s')
+                    time.sleep(0.05)
+                    response = client.get(result_url)
+            if response.status_code != 200:
+                raise RuntimeError(f'/analyze returned {response.status_code}: {response.get_data(as_text=True)[:200]}')
+            data = response.get_json()['data']
+            return {
+                'guides': data['statistics']['total_guides'],
+                'response_bytes': len(response.get_data()),
+                'mode': mode
+            }
+
+        result = measure(setup, run, repeats, memory)
+        result['guides_per_sec'] = _per_second(result['guides'], result['wall_time'])
+        results.append({'name': f'analyze_endpoint[{system}:{size}]', 'benchmark': 'analyze_endpoint',
+                        'system': system, 'size': size, **result})
+        _progress(results[-1])
+    return results
+
+
+def bench_fold_modes(sizes: List[int], seed: int, repeats: int, memory: bool,
+                     system: str = 'SpCas9') -> List[Dict[str, Any]]:
+    """
+    analyze_sequence under each FOLD_MODE. The fast entries also report the
+    speedup over full folding and how far the scores drift from it.
+    """
+    configs = {mode: type(f'{mode.title()}FoldConfig', (get_config(),), {'FOLD_MODE': mode})
+               for mode in ('full', 'fast')}
+    results = []
+    for size in sizes:
+        sequence = make_sequence(size, seed)
+        guides = {}
+        for mode, config in configs.items():
+            def run(analyzer: GuideRNAAnalyzer) -> Dict[str, Any]:
+                guides[mode] = analyzer.analyze_sequence(sequence, system)['guides']
+                return {
+                    'guides': len(guides[mode]),
+                    'fold_calls': analyzer.fold_cache.stats()['misses']
+                }
+
+            result = measure(lambda: GuideRNAAnalyzer(config), run, repeats, memory)
+            result['guides_per_sec'] = _per_second(result['guides'], result['wall_time'])
+            results.append({'name': f'fold_modes[{mode}:{system}:{size}]', 'benchmark': 'fold_modes',
+                            'mode': mode, 'system': system, 'size': size, **result})
+
+        full, fast = guides['full'], guides['fast']
+        scored = full.folded & fast.folded
+        energy_drift = np.abs(fast.energies[scored] - full.energies[scored])
+        efficiency_drift = np.abs(fast.efficiency_scores[scored] - full.efficiency_scores[scored])
+        top = min(10, int(scored.sum()))
+        results[-1].update({
+            'speedup': round(results[-2]['wall_time'] / results[-1]['wall_time'], 3),
+            'energy_drift_max': round(float(energy_drift.max(initial=0)), 3),
+            'efficiency_drift_mean': round(float(efficiency_drift.mean()) if efficiency_drift.size else 0.0, 4),
+            'efficiency_drift_max': round(float(efficiency_drift.max(initial=0)), 3),
+            'guides_changed': int(np.count_nonzero(energy_drift)),
+            # How many of full folding's 10 best guides fast folding also ranks top 10
+            'top10_overlap': len(set(np.argsort(-full.efficiency_scores, kind='stable')[:top].tolist())
+                                 & set(np.argsort(-fast.efficiency_scores, kind='stable')[:top].tolist()))
+        })
+        _progress(results[-2])
+        _progress(results[-1])
+    return results
+
+
+def _progress(result: Dict[str, Any]) -> None:
+    print(f"{result['name']:<45} {result['wall_time']:>10.4f}s", file=sys.stderr)
+
+
+def compare(results: List[Dict[str, Any]], baseline: Dict[str, Any], tolerance: float,
+            min_delta: float = 0.01) -> Dict[str, Any]:
+    """
+    Compare wall times (and fold calls, which are deterministic) against a
+    baseline report. A benchmark regresses when it is more than `tolerance`
+    slower, and by more than `min_delta` seconds so that timer noise on
+    millisecond runs isn't flagged, or makes more fold calls than before.
+    """
+    previous = {result['name']: result for result in baseline.get('results', [])}
+    entries = []
+    for result in results:
+        before = previous.get(result['name'])
+        if before is None:
+            entries.append({'name': result['name'], 'status': 'new'})
+            continue
+
+        ratio = result['wall_time'] / before['wall_time'] if before['wall_time'] else 1.0
+        significant = abs(result['wall_time'] - before['wall_time']) > min_delta
+        entry = {
+            'name': result['name'],
+            'baseline_wall_time': before['wall_time'],
+            'wall_time': result['wall_time'],
+            'ratio': round(ratio, 3)
+        }
+        if 'fold_calls' in result and 'fold_calls' in before:
+            entry['baseline_fold_calls'] = before['fold_calls']
+            entry['fold_calls'] = result['fold_calls']
+
+        if (significant and ratio > 1 + tolerance) or entry.get('fold_calls', 0) > entry.get('baseline_fold_calls', 0):
+            entry['status'] = 'regression'
+        elif significant and ratio < 1 - tolerance:
+            entry['status'] = 'improvement'
+        else:
+            entry['status'] = 'unchanged'
+        entries.append(entry)
+
+    return {
+        'tolerance': tolerance,
+        'min_delta': min_delta,
+        'baseline_created_at': baseline.get('meta', {}).get('created_at'),
+        'regressions': sum(1 for entry in entries if entry['status'] == 'regression'),
+        'results': entries
+    }
+
+
+def environment(args: argparse.Namespace) -> Dict[str, Any]:
+    try:
+        import RNA
+        vienna = RNA.__version__
+    except (ImportError, AttributeError):
+        vienna = None
+    return {
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'numpy': np.__version__,
+        'viennarna': vienna,
+        'seed': args.seed,
+        'repeats': args.repeats,
+        'sizes': args.sizes
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--sizes', type=int, nargs='+', help=f'sequence lengths (default {DEFAULT_SIZES})')
+    parser.add_argument('--quick', action='store_true', help=f'only run sizes {QUICK_SIZES}')
+    parser.add_argument('--systems', nargs='+', help='CRISPR systems (default: all)')
+    parser.add_argument('--only', nargs='+',
+                        choices=['analyze_sequence', 'process_fasta', 'find_off_target_sites', 'analyze_endpoint',
+                                 'fold_modes'],
+                        help='run a subset of the benchmarks')
+    parser.add_argument('--repeats', type=int, default=3, help='timed runs per benchmark (best is kept)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--no-memory', action='store_true', help='skip the tracemalloc pass')
+    parser.add_argument('--output', help='write the JSON report here (default: stdout)')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='baseline report to compare against')
+    parser.add_argument('--save-baseline', action='store_true', help='write this run as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed slowdown before flagging (0.2 = 20%%)')
+    parser.add_argument('--min-delta', type=float, default=0.01,
+                        help='ignore wall time differences smaller than this many seconds')
+    parser.add_argument('--fail-on-regression', action='store_true', help='exit with status 1 on regressions')
+    args = parser.parse_args(argv)
+    args.sizes = args.sizes or (QUICK_SIZES if args.quick else DEFAULT_SIZES)
+    return args
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    systems = args.systems or list(GuideRNAAnalyzer().crispr_systems)
+    selected = args.only or ['analyze_sequence', 'process_fasta', 'find_off_target_sites', 'analyze_endpoint',
+                             'fold_modes']
+    memory = not args.no_memory
+
+    results = []
+    if 'analyze_sequence' in selected:
+        results += bench_analyze_sequence(args.sizes, systems, args.seed, args.repeats, memory)
+    if 'process_fasta' in selected:
+        results += bench_process_fasta(args.sizes, args.seed, args.repeats, memory)
+    if 'find_off_target_sites' in selected:
+        results += bench_off_targets(args.sizes, args.seed, args.repeats, memory)
+    if 'analyze_endpoint' in selected:
+        results += bench_analyze_endpoint(args.sizes, args.seed, args.repeats, memory)
+    if 'fold_modes' in selected:
+        results += bench_fold_modes(args.sizes, args.seed, args.repeats, memory)
+
+    report = {'meta': environment(args), 'results': results}
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            report['comparison'] = compare(results, json.load(f), args.tolerance, args.min_delta)
+
+    text = json.dumps(report, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            f.write(text + '\n')
+        print(f'Baseline written to {args.baseline}', file=sys.stderr)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    elif not args.save_baseline:
+        print(text)
+
+    comparison = report.get('comparison')
+    if comparison:
+        for entry in comparison['results']:
+            if entry['status'] != 'unchanged':
+                print(f"{entry['status']:<12} {entry['name']} {entry.get('ratio', '')}", file=sys.stderr)
+        if comparison['regressions'] and args.fail_on_regression:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from pathlib import Path
 from typing import Dict, Any
 
@@ -14,8 +15,8 @@ class Config:
     """
 
 
-    # Base directory
-    BASE_DIR = Path(__file__).parent.parent.absolute()
+    # Base directory (the project root, where this file lives)
+    BASE_DIR = Path(__file__).parent.absolute()
 
     # Flask stuff - basic but necessary
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'my-secret-key-for-dev'
@@ -30,6 +31,67 @@ class Config:
     MIN_SEQUENCE_LENGTH = 20
     MAX_SEQUENCE_LENGTH = 200000  # 200kb should cover most use cases
     CACHE_TIMEOUT = 3600  # 1 hour
+    RESULT_CACHE_MAX_BYTES = 256 * 1024 * 1024  # analysis results kept in memory
+    FOLD_CACHE_SIZE = 100000  # folded guides kept in memory (LRU)
+    # Optional on-disk fold store shared by all workers on the host and kept
+    # across restarts (SQLite); unset to fold from scratch in every process
+    FOLD_STORE_PATH = os.environ.get('FOLD_STORE_PATH')
+    FOLD_STORE_MAX_ENTRIES = int(os.environ.get('FOLD_STORE_MAX_ENTRIES', 1000000))
+
+    # Incremental re-analysis - an input sharing at least this fraction (as
+    # common prefix + suffix) with one of the last INCREMENTAL_HISTORY inputs
+    # only has the edited region rescanned
+    INCREMENTAL_HISTORY = 8
+    INCREMENTAL_MIN_SHARED = 0.5
+
+    # Parallel folding - 0 workers keeps everything in the request thread
+    FOLD_WORKERS = int(os.environ.get('FOLD_WORKERS', 0))
+    FOLD_CHUNK_SIZE = 256  # guides per task sent to a worker
+    PARALLEL_FOLD_THRESHOLD = 2000  # smaller batches aren't worth the IPC
+
+    # Lazy scoring - guides outside this GC range are never folded, and with
+    # FOLD_TOP_N > 0 only the N most promising survivors are. The rest can be
+    # folded on demand through /guides/<guide>/structure
+    PREFILTER_MIN_GC = 20.0
+    PREFILTER_MAX_GC = 80.0
+    FOLD_TOP_N = int(os.environ.get('FOLD_TOP_N', 0))  # 0 folds every survivor
+
+    # Guides per response page (clients can ask for up to MAX_GUIDE_PAGE_SIZE)
+    GUIDE_PAGE_SIZE = 100
+    MAX_GUIDE_PAGE_SIZE = 1000
+    # Chart data is capped at this many points: larger sets plot the best
+    # guide of each of this many position bins
+    CHART_MAX_POINTS = 500
+    # Results with more than one page are shared here (SQLite, kept for
+    # CACHE_TIMEOUT) so any worker can serve their next pages
+    RESULT_STORE_PATH = os.environ.get('RESULT_STORE_PATH') or os.path.join(tempfile.gettempdir(), 'crispradium_results.sqlite3')
+
+    # Background jobs - inputs this long are analyzed asynchronously
+    ASYNC_THRESHOLD = 50000  # bases
+    JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))
+    JOB_RETENTION = 3600  # finished jobs are kept for an hour
+    JOB_STORE_PATH = os.environ.get('JOB_STORE_PATH') or os.path.join(tempfile.gettempdir(), 'crispradium_jobs.sqlite3')
+
+    # Batch analysis - records per /batch request, and worker processes
+    # analyzing distinct sequences of a batch side by side (0 analyzes them
+    # one by one in the request thread)
+    MAX_BATCH_RECORDS = 500
+    BATCH_WORKERS = int(os.environ.get('BATCH_WORKERS', 2))
+
+    # Requests sending an X-Debug-Timing header get a Server-Timing header
+    # with their per-stage breakdown back
+    TIMING_HEADER_ENABLED = True
+
+    # Response compression - bodies at least this large are sent brotli
+    # (if installed) or gzip compressed to clients that accept it
+    COMPRESS_MIN_SIZE = 1024  # bytes
+    COMPRESS_MIMETYPES = {'application/json', 'text/plain', 'text/html'}
+    GZIP_LEVEL = 6
+    BROTLI_QUALITY = 4  # higher levels cost far more CPU for dynamic bodies
+
+    # Reference genome index for genome-wide off-target search
+    # (build one with `flask build-genome-index genome.fa <dir>`)
+    GENOME_INDEX_PATH = os.environ.get('GENOME_INDEX_PATH')
 
     # Scoring weights
     SCORING_WEIGHTS = {
@@ -41,23 +103,27 @@ class Config:
     # RNA folding parameters - don't mess with these unless you know what you're doing
     RNA_FOLDING = {
         'temperature': 37.0,  # Celsius
+        # Not applied: ViennaRNA's interior loop limit (MAXLOOP, also 30) is
+        # fixed when the library is built, and guides are too short to reach it
         'max_loop_length': 30,
         'max_bp_span': 100
     }
+    # 'full' folds every guide for its MFE structure and energy; 'fast' only
+    # computes the MFE energy (no structure string), with base pairs limited
+    # to FAST_FOLD_MAX_BP_SPAN. `benchmarks/run.py --only fold_modes` shows
+    # the speedup and how far the scores drift.
+    FOLD_MODE = os.environ.get('FOLD_MODE', 'full')
+    FAST_FOLD_MAX_BP_SPAN = 12
 
 
-    @staticmethod
-    def init_app(app):
+    @classmethod
+    def init_app(cls, app):
         """
         Initialize the app with this config. Also creates necessary directories
         because I'm tired of seeing those FileNotFoundError exceptions.
+        Called by create_app before the config is loaded into app.config.
         """
-        os.makedirs(Config.UPLOAD_FOLDER, exist_ok=True)
-        
-        # Set some sane defaults for production
-        if not Config.DEBUG:
-            Config.CACHE_TIMEOUT = 7200  # 2 hours in prod
-            Config.MAX_CONTENT_LENGTH = 32 * 1024 * 1024  # 32MB in prod
+        os.makedirs(cls.UPLOAD_FOLDER, exist_ok=True)
 
 
 class DevelopmentConfig(Config):
@@ -75,6 +141,7 @@ class ProductionConfig(Config):
     """
     DEBUG = False
     CACHE_TIMEOUT = 7200  # 2 hours
+    MAX_CONTENT_LENGTH = 32 * 1024 * 1024  # 32MB
     
     # Override this in environment!
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'seriously-change-this-in-prod'
@@ -0,0 +1,66 @@
+import random
+
+import pytest
+
+from app.folding import FoldParams, FoldPool, fold_sequence, load_rna
+
+
+def random_guides(count, seed, length=20):
+    rng = random.Random(seed)
+    return [''.join(rng.choices('ACGU', k=length)) for _ in range(count)]
+
+
+@pytest.fixture
+def pool():
+    # A small threshold and chunk size so even short batches take the
+    # parallel path and are split across several tasks
+    pool = FoldPool(workers=2, chunk_size=7, min_batch=10)
+    yield pool
+    pool.shutdown()
+
+
+def test_pool_matches_serial_fold_in_input_order(pool):
+    RNA = load_rna()
+    sequences = random_guides(100, seed=1)
+    # Repeats must come back at each of their positions too
+    sequences += sequences[:5]
+
+    assert pool.fold(sequences) == [tuple(RNA.fold(sequence)) for sequence in sequences]
+
+
+def test_pool_reports_progress_per_chunk(pool):
+    sequences = random_guides(30, seed=2)
+    reported = []
+
+    results = pool.fold(sequences, progress=reported.append)
+
+    assert len(results) == 30
+    assert reported == [7, 14, 21, 28, 30]
+
+
+@pytest.mark.parametrize('params', [
+    FoldParams('full', 37.0, 100),
+    FoldParams('full', 25.0, 100),
+    FoldParams('fast', 37.0, 12),
+])
+def test_pool_matches_serial_fold_with_params(pool, params):
+    sequences = random_guides(40, seed=3)
+
+    assert pool.fold(sequences, params) == [fold_sequence(sequence, params) for sequence in sequences]
+
+
+def test_full_mode_at_default_settings_matches_library_defaults():
+    RNA = load_rna()
+    params = FoldParams('full', 37.0, 100)
+
+    for sequence in random_guides(50, seed=4):
+        assert fold_sequence(sequence, params) == tuple(RNA.fold(sequence))
+
+
+def test_serial_path_below_threshold():
+    pool = FoldPool(workers=2, chunk_size=7, min_batch=1000)
+    sequences = random_guides(20, seed=5)
+
+    assert pool.fold(sequences) == [fold_sequence(sequence) for sequence in sequences]
+    # Small batches never start the process pool
+    assert pool._executor is None
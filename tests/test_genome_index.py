@@ -0,0 +1,109 @@
+import random
+
+import pytest
+
+from app import genome_index
+from app.genome_index import GenomeIndex, GenomeSite, build_genome_index
+
+COMPLEMENT = {'A': 'T', 'T': 'A', 'G': 'C', 'C': 'G'}
+
+
+def reverse_complement(sequence):
+    return ''.join(COMPLEMENT.get(base, 'N') for base in reversed(sequence))
+
+
+def mismatches(guide, site):
+    """N counts as a mismatch against everything, N included."""
+    return sum(1 for x, y in zip(guide, site) if x != y or x == 'N' or y == 'N')
+
+
+def naive_sites(contigs, guide, max_mismatches):
+    """Every window of every contig, on both strands."""
+    sites = set()
+    for name, sequence in contigs:
+        for start in range(len(sequence) - len(guide) + 1):
+            window = sequence[start:start + len(guide)]
+            for strand, query in (('+', guide), ('-', reverse_complement(guide))):
+                count = mismatches(query, window)
+                if count <= max_mismatches:
+                    site = window if strand == '+' else reverse_complement(window)
+                    sites.add(GenomeSite(name, start, strand, site, count))
+    return sites
+
+
+def mutate(rng, sequence, count):
+    bases = list(sequence)
+    for i in rng.sample(range(len(bases)), count):
+        bases[i] = rng.choice([base for base in 'ACGTN' if base != bases[i]])
+    return ''.join(bases)
+
+
+def random_genome(seed, guide_length=20):
+    """Contigs with Ns and near copies of a guide planted on both strands and at the ends."""
+    rng = random.Random(seed)
+    guide = ''.join(rng.choices('ACGT', k=guide_length))
+    contigs = []
+    for number, length in enumerate((rng.randint(300, 900), guide_length, 37, rng.randint(300, 900))):
+        sequence = list(rng.choices('ACGT', k=length))
+        for position in rng.sample(range(length), length // 50):
+            sequence[position] = 'N'
+        sequence = ''.join(sequence)
+        starts = [0, length - guide_length] + [rng.randrange(length - guide_length + 1) for _ in range(length // 60)]
+        for planted, start in enumerate(starts):
+            site = mutate(rng, guide, rng.randint(0, 4))
+            if planted % 2:
+                site = reverse_complement(site)
+            sequence = sequence[:start] + site + sequence[start + guide_length:]
+        contigs.append((f'chr{number}', sequence))
+    return contigs, guide
+
+
+def write_fasta(path, contigs):
+    with open(path, 'w') as fasta:
+        for name, sequence in contigs:
+            fasta.write(f'>{name} test contig\n')
+            # Wrapped and partly lowercase, like real references
+            for start in range(0, len(sequence), 60):
+                line = sequence[start:start + 60]
+                fasta.write((line.lower() if start % 120 else line) + '\n')
+
+
+@pytest.fixture(autouse=True)
+def small_build_chunks(monkeypatch):
+    # Contigs span several chunks, as real chromosomes do
+    monkeypatch.setattr(genome_index, 'BUILD_CHUNK', 64)
+
+
+@pytest.mark.parametrize('seed_length', [10, 5])
+@pytest.mark.parametrize('seed', range(8))
+def test_matches_brute_force_scan(tmp_path, seed, seed_length):
+    contigs, guide = random_genome(seed)
+    write_fasta(tmp_path / 'genome.fa', contigs)
+    meta = build_genome_index(str(tmp_path / 'genome.fa'), str(tmp_path / 'index'), seed_length)
+    assert [(c['name'], c['length']) for c in meta['contigs']] == [(n, len(s)) for n, s in contigs]
+
+    index = GenomeIndex(str(tmp_path / 'index'))
+    for max_mismatches in range(index.max_mismatches_for(len(guide)) + 1):
+        expected = naive_sites(contigs, guide, max_mismatches)
+        found = index.search(guide, max_mismatches)
+        assert len(found) == len(set(found))
+        assert set(found) == expected
+
+
+def test_guide_with_n(tmp_path):
+    contigs, guide = random_genome(99)
+    write_fasta(tmp_path / 'genome.fa', contigs)
+    build_genome_index(str(tmp_path / 'genome.fa'), str(tmp_path / 'index'))
+    index = GenomeIndex(str(tmp_path / 'index'))
+    guide = guide[:4] + 'N' + guide[5:]
+    assert set(index.search(guide, 3)) == naive_sites(contigs, guide, 3)
+
+
+def test_mismatch_bound(tmp_path):
+    contigs, guide = random_genome(0)
+    write_fasta(tmp_path / 'genome.fa', contigs)
+    build_genome_index(str(tmp_path / 'genome.fa'), str(tmp_path / 'index'))
+    index = GenomeIndex(str(tmp_path / 'index'))
+    assert index.max_mismatches_for(20) == 3
+    with pytest.raises(ValueError):
+        index.search(guide, 4)
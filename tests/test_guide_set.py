@@ -0,0 +1,30 @@
+import math
+
+from app.guide_set import GuideSet
+
+
+def records():
+    return [
+        # folded in full mode
+        {'sequence': 'ACGTACGTACGTACGTACGT', 'position': 0, 'strand': '+', 'pam': 'AGG', 'gc_content': 50.0,
+         'structure_score': {'structure': '....((....))......', 'energy': -1.5, 'score': 80.0},
+         'efficiency_score': 71.25},
+        # folded in fast mode: energy and scores, no structure
+        {'sequence': 'GGGGCCCCAAAATTTTGGGG', 'position': 17, 'strand': '-', 'pam': 'CCN', 'gc_content': 60.0,
+         'structure_score': {'structure': None, 'energy': -0.3, 'score': 95.0},
+         'efficiency_score': 88.0},
+        # skipped by the prefilter
+        {'sequence': 'AAAAAAAAAAAAAAAAAAAA', 'position': 40, 'strand': '+', 'pam': 'TTTV', 'gc_content': 0.0,
+         'structure_score': None, 'efficiency_score': None},
+    ]
+
+
+def test_bytes_round_trip():
+    guides = GuideSet.from_records(records())
+    restored = GuideSet.from_bytes(guides.to_bytes())
+    assert restored.to_records() == records()
+    assert math.isnan(restored.energies[2])
+
+
+def test_empty_round_trip():
+    assert len(GuideSet.from_bytes(GuideSet.empty().to_bytes())) == 0
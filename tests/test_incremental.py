@@ -0,0 +1,78 @@
+import random
+
+import numpy as np
+import pytest
+
+from app.guide_rna_analyzer import GuideRNAAnalyzer
+
+SYSTEMS = ['SpCas9', 'SaCas9', 'Cas12a']
+
+
+@pytest.fixture(scope='module')
+def analyzer():
+    return GuideRNAAnalyzer()
+
+
+def assert_same_guides(actual, expected):
+    assert actual.sequences.tolist() == expected.sequences.tolist()
+    assert actual.positions.tolist() == expected.positions.tolist()
+    assert actual.strands.tolist() == expected.strands.tolist()
+    assert actual.pams.tolist() == expected.pams.tolist()
+    assert actual.structures.tolist() == expected.structures.tolist()
+    for column in ('gc_contents', 'energies', 'structure_scores', 'efficiency_scores'):
+        assert np.array_equal(getattr(actual, column), getattr(expected, column), equal_nan=True), column
+
+
+def edit(rng, sequence, position):
+    """Substitute, insert, delete or replace a few bases at position."""
+    kind = rng.choice(['substitute', 'insert', 'delete', 'replace'])
+    size = rng.randint(1, 6)
+    bases = ''.join(rng.choices('ACGT', k=size))
+    if kind == 'substitute':
+        return sequence[:position] + bases[0] + sequence[position + 1:]
+    if kind == 'insert':
+        return sequence[:position] + bases + sequence[position:]
+    if kind == 'delete':
+        return sequence[:position] + sequence[position + size:]
+    return sequence[:position] + bases + sequence[position + rng.randint(1, 6):]
+
+
+def edit_positions(rng, analyzer, sequence, system):
+    """Both ends of the sequence, and the edges of a protospacer and its PAM."""
+    scanner = analyzer.pam_scanners[system]
+    site = rng.choice(scanner.scan(sequence))
+    span = scanner.guide_length + scanner.pam_length
+    boundaries = [site.position - scanner.pam_length, site.position, site.position + scanner.guide_length,
+                  site.position + span]
+    positions = [0, 1, len(sequence) - 1, len(sequence)]
+    positions += [boundary + delta for boundary in boundaries for delta in (-1, 0, 1)]
+    return [position for position in positions if 0 <= position <= len(sequence)]
+
+
+@pytest.mark.parametrize('system', SYSTEMS)
+@pytest.mark.parametrize('seed', range(5))
+def test_incremental_matches_full_recompute(analyzer, system, seed):
+    rng = random.Random(f'{system}:{seed}')
+    base = ''.join(rng.choices('ACGT', k=1500))
+    analyzer.analyze_sequence(base, system)
+
+    for position in edit_positions(rng, analyzer, base, system):
+        edited = edit(rng, base, position)
+        incremental = analyzer.find_guides_incremental(edited, system)
+
+        assert incremental is not None
+        assert_same_guides(incremental, analyzer.find_guides(edited, system))
+
+
+@pytest.mark.parametrize('system', SYSTEMS)
+def test_chained_edits_match_a_fresh_analyzer(analyzer, system):
+    rng = random.Random(system)
+    sequence = ''.join(rng.choices('ACGT', k=2000))
+    analyzer.analyze_sequence(sequence, system)
+
+    # Each edit is analyzed incrementally from the previous version
+    for _ in range(10):
+        sequence = edit(rng, sequence, rng.randrange(len(sequence) + 1))
+        results = analyzer.analyze_sequence(sequence, system)
+
+    assert_same_guides(results['guides'], GuideRNAAnalyzer().find_guides(sequence, system))
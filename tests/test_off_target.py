@@ -0,0 +1,123 @@
+import random
+
+import pytest
+
+from app.off_target import SeedIndex
+from app.sequence_handler import SequenceHandler
+
+COMPLEMENT = {'A': 'T', 'T': 'A', 'G': 'C', 'C': 'G', 'N': 'N'}
+
+
+def reverse_complement(sequence):
+    return ''.join(COMPLEMENT[base] for base in reversed(sequence))
+
+
+def hamming(a, b):
+    return sum(1 for x, y in zip(a, b) if x != y)
+
+
+def naive_sites(guide, sequence, max_mismatches=3):
+    """The original brute-force scan: every window of both strands."""
+    sites = []
+    for i in range(len(sequence) - len(guide) + 1):
+        site = sequence[i:i + len(guide)]
+        if hamming(guide, site) <= max_mismatches:
+            sites.append(site)
+    reverse = reverse_complement(sequence)
+    for i in range(len(reverse) - len(guide) + 1):
+        site = reverse[i:i + len(guide)]
+        if hamming(guide, site) <= max_mismatches and site != guide:
+            sites.append(site)
+    return sites
+
+
+def mutate(rng, sequence, mismatches):
+    bases = list(sequence)
+    for i in rng.sample(range(len(bases)), mismatches):
+        bases[i] = rng.choice([base for base in 'ACGT' if base != bases[i]])
+    return ''.join(bases)
+
+
+def plant(sequence, site, position):
+    return sequence[:position] + site + sequence[position + len(site):]
+
+
+def random_case(seed, length=600, guide_length=20):
+    """A random sequence with near copies of a guide planted on both strands and at both ends."""
+    rng = random.Random(seed)
+    sequence = ''.join(rng.choices('ACGT', k=length))
+    guide = ''.join(rng.choices('ACGT', k=guide_length))
+    positions = [0, length - guide_length] + rng.sample(range(guide_length, length - 2 * guide_length), 6)
+    for number, position in enumerate(positions):
+        site = mutate(rng, guide, rng.randint(0, 4))
+        if number % 2:
+            site = reverse_complement(site)
+        sequence = plant(sequence, site, position)
+    return sequence, guide
+
+
+@pytest.mark.parametrize('seed', range(40))
+def test_matches_brute_force_scan(seed):
+    sequence, guide = random_case(seed)
+
+    assert SequenceHandler().find_off_target_sites(guide, sequence) == naive_sites(guide, sequence)
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_sites_report_position_strand_and_mismatches(seed):
+    sequence, guide = random_case(seed)
+    guide_length = len(guide)
+
+    for site in SeedIndex(sequence).search(guide):
+        window = sequence[site.position:site.position + guide_length]
+        if site.strand == '+':
+            assert site.sequence == window
+        else:
+            assert site.sequence == reverse_complement(window)
+            assert site.mismatches > 0
+        assert site.mismatches == hamming(guide, site.sequence) <= 3
+
+
+def test_reverse_strand_sites():
+    rng = random.Random(1)
+    guide = ''.join(rng.choices('ACGT', k=20))
+    sequence = ''.join(rng.choices('ACGT', k=100))
+    # An exact reverse-strand copy is skipped; a one-mismatch copy is found
+    sequence = plant(sequence, reverse_complement(guide), 10)
+    sequence = plant(sequence, reverse_complement(mutate(rng, guide, 1)), 60)
+
+    sites = SeedIndex(sequence).search(guide)
+
+    assert [(site.position, site.strand) for site in sites if site.strand == '-'] == [(60, '-')]
+    assert SequenceHandler().find_off_target_sites(guide, sequence) == naive_sites(guide, sequence)
+
+
+@pytest.mark.parametrize('length', [20, 21, 39])
+def test_sites_at_sequence_edges(length):
+    rng = random.Random(length)
+    guide = ''.join(rng.choices('ACGT', k=20))
+    sequence = plant(''.join(rng.choices('ACGT', k=length)), mutate(rng, guide, 2), 0)
+    sequence = plant(sequence, reverse_complement(mutate(rng, guide, 3)), length - 20)
+
+    assert SequenceHandler().find_off_target_sites(guide, sequence) == naive_sites(guide, sequence)
+
+
+def test_sequence_shorter_than_guide():
+    assert SequenceHandler().find_off_target_sites('ACGTACGTACGTACGTACGT', 'ACGTACGT') == []
+
+
+def test_n_bases_match_only_n():
+    rng = random.Random(7)
+    sequence = ''.join(rng.choices('ACGTN', weights=[5, 5, 5, 5, 1], k=500))
+    guide = sequence[100:120]
+
+    assert SequenceHandler().find_off_target_sites(guide, sequence) == naive_sites(guide, sequence)
+
+
+@pytest.mark.parametrize('guide_length', [12, 23])
+def test_short_and_long_guides(guide_length):
+    # 12 bases split four ways is shorter than a seed, so the index falls
+    # back to checking every window
+    sequence, guide = random_case(guide_length, guide_length=guide_length)
+
+    assert SequenceHandler().find_off_target_sites(guide, sequence) == naive_sites(guide, sequence)